@@ -0,0 +1,352 @@
+'''
+tweet counts grouped once when the dataset is loaded
+
+the callbacks and chart functions slice these small tables ( one row per group ) instead of copying
+and grouping the whole dataframe on every request
+
+the counts of several dataframes can be added together so they can also be built from the csv file
+read in chunks without ever having the whole dataset in memory
+'''
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+import dataset
+import instrumentation
+import token_store
+import time_index
+import trending
+
+'''
+version of the aggregates , it has to be increased whenever the attributes of TweetAggregates change
+so the aggregates saved in the cache folder are made again
+'''
+AGGREGATES_VERSION = 6
+
+
+'''
+counting tweets of each group and giving the result a plain ( non categorical ) index
+so counts of different dataframes can be added together
+'''
+def count_by(df, keys):
+    counts = df.groupby(keys, sort=False, observed=True)['tweetId'].count()
+    if counts.empty:
+        return counts.astype('int64')
+    if isinstance(counts.index, pd.MultiIndex):
+        counts.index = pd.MultiIndex.from_tuples(counts.index.to_list(), names=counts.index.names)
+    else:
+        counts.index = pd.Index(counts.index.to_list(), name=counts.index.name)
+    return counts
+
+
+'''
+counting the words of the cleaned text of each topic ( from the words ids of token_store.py file )
+'''
+def count_terms(df):
+    return count_day_terms(df).groupby(level=['topic', 'term'], sort=False).sum()
+
+
+'''
+counting the words of the cleaned text of each topic for each day , only the words used that day are kept
+'''
+def count_day_terms(df):
+    tokens = token_store.of(df)
+    topic_codes, topics = pd.factorize(df['topic'])
+    day_codes, days = pd.factorize(df['created'].dt.floor('D'))
+
+    # one group for each ( topic , day ) , tweets without a topic or a date aren't counted
+    counted = (topic_codes >= 0) & (day_codes >= 0)
+    not_counted = len(topics) * len(days)
+    groups, ids, counts = tokens.group_counts(np.where(counted, topic_codes * len(days) + day_codes, not_counted))
+    kept = groups < not_counted
+
+    index = pd.MultiIndex.from_arrays([np.asarray(topics, dtype=object)[groups[kept] // len(days)],
+                                       days[groups[kept] % len(days)], tokens.vocabulary[ids[kept]]],
+                                      names=['topic', 'created', 'term'])
+    return pd.Series(counts[kept], index=index, dtype='int64')
+
+
+'''
+header indicators counted by (topic, country, day) in one grouping of the dataframe : number of tweets and sums and
+numbers of values of the count columns ( tweets without a country are kept with a missing country )
+'''
+def count_kpis(df):
+    aggregations = {'tweets': ('tweetId', 'count')}
+    for column in dataset.count_columns:
+        aggregations[column + '_sum'] = (column, 'sum')
+        aggregations[column + '_count'] = (column, 'count')
+
+    days = df['created'].dt.floor('D')
+    kpis = df.groupby([df['topic'], df['country'], days], sort=False, observed=True, dropna=False).agg(**aggregations)
+    if not kpis.empty:
+        kpis.index = pd.MultiIndex.from_tuples(kpis.index.to_list(), names=kpis.index.names)
+    return kpis.astype('int64')
+
+
+'''
+header indicators of every ( topic , country ) filter , all topics and all countries are None
+so getting the indicators of a filter is one dictionary lookup
+'''
+def kpis_lookup(kpis):
+    pairs = kpis.groupby(level=['topic', 'country'], sort=False, dropna=False).sum()
+    located = pairs[pairs.index.get_level_values('country').notna()]
+
+    lookup = {(None, None): dict(pairs.sum(), countries=len(located.index.unique('country')))}
+    for topic, values in pairs.groupby(level='topic', sort=False).sum().to_dict('index').items():
+        lookup[(topic, None)] = dict(values, countries=int((located.index.get_level_values('topic') == topic).sum()))
+    for country, values in located.groupby(level='country', sort=False).sum().to_dict('index').items():
+        lookup[(None, country)] = dict(values, countries=1)
+    for (topic, country), values in located.to_dict('index').items():
+        lookup[(topic, country)] = dict(values, countries=1)
+    return lookup
+
+
+'''
+adding the new header indicators of a kpis part to a lookup made by kpis_lookup() , a country or a ( topic , country )
+pair not in the lookup yet adds one to the number of countries of all topics or of the topic
+'''
+def add_kpis_lookup(lookup, kpis):
+    pairs = kpis.groupby(level=['topic', 'country'], sort=False, dropna=False).sum()
+    for (topic, country), values in pairs.to_dict('index').items():
+        located = not pd.isna(country)
+        new_country = located and (None, country) not in lookup
+        new_pair = located and (topic, country) not in lookup
+
+        for key in [(None, None), (topic, None)] + ([(None, country), (topic, country)] if located else []):
+            indicators = lookup.setdefault(key, dict(dict.fromkeys(values, 0), countries=0))
+            for column, value in values.items():
+                indicators[column] += value
+        lookup[(None, None)]['countries'] += new_country
+        lookup[(topic, None)]['countries'] += new_pair
+        if located:
+            lookup[(None, country)]['countries'] = lookup[(topic, country)]['countries'] = 1
+    return lookup
+
+
+def add_counts(counts, new_counts):
+    if counts is None:
+        return new_counts
+    return counts.add(new_counts, fill_value=0).astype('int64')
+
+
+'''
+adding parts of counts together in one grouping ( the keys of the parts are plain values so they can be concatenated )
+'''
+def add_parts(counts, parts):
+    counts = pd.concat([counts] + parts)
+    return counts.groupby(level=list(range(counts.index.nlevels)), sort=False, dropna=False).sum().astype('int64')
+
+
+class TweetAggregates:
+    def __init__(self):
+        self.daily = None  # tweets by (topic, sentiment, day)
+        self.hourly = None  # tweets by (topic, sentiment, hour)
+        self.time_index = None  # date indexed counts made from the hourly counts when first needed
+        self.topic_sentiment = None  # tweets by (sentiment, topic)
+        self.countries = None  # tweets by country
+        self.cities = None  # tweets by city
+        self.terms = None  # occurrences of each word of the cleaned text by (topic, term)
+        self.day_terms = None  # occurrences of each word of the cleaned text by (topic, day, term)
+        self.trending_index = None  # words counts by day of each topic made from day_terms when first needed
+        self.map_points = None  # tweets by (country, country_lon, country_lat)
+        self.city_points = None  # tweets by (city, city_lon, city_lat) when the dataset has city coordinates
+        self.reliability = None  # tweets by reliability category
+        self.kpis = None  # number of tweets and sums and numbers of values of the count columns by (topic, country, day)
+        self.kpis_lookup = None  # header indicators of each ( topic , country ) filter made from kpis when first needed
+        self.topics = []  # topics in the order they appear in the dataset
+        # the counts with many groups ( hourly , terms , day_terms and kpis ) are kept as parts added together only
+        # when they are read with counts() , their indexes are updated with the new parts instead of being made again
+        self.parts = {}  # name of the counts -> parts not added to them yet
+        self.lock = threading.RLock()  # held while parts are added or read and while the indexes are made or updated
+
+    '''
+    adding the counts of a dataframe , terms=False skips counting words ( for filtered views without word clouds )
+    '''
+    def update(self, df, terms=True):
+        days = df['created'].dt.floor('D')
+        self.daily = add_counts(self.daily, count_by(df, [df['topic'], df['sentiment'], days]))
+        hours = df['created'].dt.floor('h')
+        hourly = count_by(df, [df['topic'], df['sentiment'], hours])
+        with self.lock:
+            self.add_part('hourly', hourly)
+            if self.time_index is not None and len(hourly):
+                self.time_index.add(hourly)
+        self.topic_sentiment = add_counts(self.topic_sentiment, count_by(df, ['sentiment', 'topic']))
+        self.countries = add_counts(self.countries, count_by(df, 'country'))
+        self.cities = add_counts(self.cities, count_by(df, 'city'))
+        if terms:
+            day_terms = count_day_terms(df)
+            with self.lock:
+                self.add_part('day_terms', day_terms)
+                self.add_part('terms', day_terms.groupby(level=['topic', 'term'], sort=False).sum())
+                if self.trending_index is not None and len(day_terms):
+                    self.trending_index.add(day_terms)
+        self.map_points = add_counts(self.map_points, count_by(df, ['country', 'country_lon', 'country_lat']))
+        if 'city_lon' in df.columns:
+            self.city_points = add_counts(self.city_points, count_by(df, ['city', 'city_lon', 'city_lat']))
+        self.reliability = add_counts(self.reliability, count_by(df, 'Reliability Categories'))
+        kpis = count_kpis(df)
+        with self.lock:
+            self.add_part('kpis', kpis)
+            if self.kpis_lookup is not None:
+                add_kpis_lookup(self.kpis_lookup, kpis)
+        self.topics.extend(topic for topic in df['topic'].unique() if topic not in self.topics)
+        return self
+
+    def add_part(self, name, counts):
+        with self.lock:
+            if getattr(self, name) is None:
+                setattr(self, name, counts)
+            elif len(counts):
+                self.parts.setdefault(name, []).append(counts)
+
+    '''
+    counts of a name with the parts not added to them yet
+    '''
+    def counts(self, name):
+        with self.lock:
+            parts = self.parts.pop(name, None)
+            if parts:
+                setattr(self, name, add_parts(getattr(self, name), parts))
+            return getattr(self, name)
+
+    '''
+    the parts are added to the counts before the aggregates are saved to the cache folder ( without the lock )
+    '''
+    def __getstate__(self):
+        for name in list(self.parts):
+            self.counts(name)
+        return {name: value for name, value in self.__dict__.items() if name != 'lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, lock=threading.RLock())
+
+    '''
+    header indicators of all tweets or of the tweets of a topic and / or country
+    '''
+    def indicators(self, topic=None, country=None):
+        with self.lock:
+            if self.kpis_lookup is None:
+                self.kpis_lookup = kpis_lookup(self.counts('kpis'))
+        return self.kpis_lookup.get((topic, country), {})
+
+    def tweets_number(self, topic=None, country=None):
+        return int(self.indicators(topic, country).get('tweets', 0))
+
+    def average(self, column, topic=None, country=None):
+        indicators = self.indicators(topic, country)
+        if not indicators.get(column + '_count'):
+            return 0
+        return indicators[column + '_sum'] / indicators[column + '_count']
+
+    def countries_number(self, topic=None, country=None):
+        return self.indicators(topic, country).get('countries', 0)
+
+    '''
+    number of tweets of one sentiment for each day ( same as resampling the tweets of that sentiment by 1 day )
+    selected_topic is a topic or 'All Topics'
+    '''
+    def daily_counts(self, selected_topic, sentiment):
+        data = self.daily
+        if selected_topic != 'All Topics':
+            data = data[data.index.get_level_values('topic') == selected_topic]
+        data = data[data.index.get_level_values('sentiment') == sentiment]
+
+        data = data.groupby(level='created').sum()
+        if data.empty:
+            return pd.Series([], index=pd.DatetimeIndex([], freq='D', name='created'), dtype='int64')
+
+        days = pd.date_range(data.index.min(), data.index.max(), freq='D', name='created')
+        return data.reindex(days, fill_value=0)
+
+    '''
+    date indexed counts used for ranges of dates of the line chart
+    '''
+    def dates_index(self):
+        with self.lock:
+            if self.time_index is None:
+                self.time_index = time_index.TimeIndex(self.counts('hourly'))
+        return self.time_index
+
+    '''
+    words counts by day used for the trending words
+    '''
+    def terms_index(self):
+        with self.lock:
+            if self.trending_index is None:
+                self.trending_index = trending.TermIndex(self.counts('day_terms'))
+        return self.trending_index
+
+    '''
+    number of tweets of each topic for one sentiment
+    '''
+    def topic_counts(self, sentiment):
+        data = self.topic_sentiment
+        return data[data.index.get_level_values('sentiment') == sentiment].droplevel('sentiment')
+
+    '''
+    number of times each word is used in the tweets of a topic ( or 'All Topics' )
+    '''
+    def term_counts(self, selected_topic):
+        terms = self.counts('terms')
+        if selected_topic == 'All Topics':
+            return terms.groupby(level='term').sum()
+        return terms[terms.index.get_level_values('topic') == selected_topic].droplevel('topic')
+
+    '''
+    number of tweets of each city or country ( location is 'city' or 'country' )
+    '''
+    def location_counts(self, location):
+        return self.cities if location == 'city' else self.countries
+
+
+def build_aggregates(df):
+    with instrumentation.phase('build_aggregates'):
+        return TweetAggregates().update(df)
+
+
+'''
+building the counts from the csv file read and cleaned chunk by chunk
+'''
+def build_aggregates_from_csv(csv_file, chunksize=None):
+    cube = TweetAggregates()
+    for chunk in dataset.read_dataset_chunks(csv_file, chunksize):
+        with instrumentation.phase('build_aggregates'):
+            cube.update(chunk)
+    return cube
+
+
+'''
+getting the aggregates of a dataset version from the cache folder if they exist otherwise building them with build()
+and saving them so the other app processes load them instead of counting the dataset again
+'''
+def cached_aggregates(version, build):
+    cache_file = os.path.join(dataset.CACHE_DIR, 'aggregates-{}-{}.pickle'.format(version, AGGREGATES_VERSION))
+    if os.path.exists(cache_file):
+        with instrumentation.phase('load_aggregates'), open(cache_file, 'rb') as f:
+            return pickle.load(f)
+
+    cube = build()
+    os.makedirs(dataset.CACHE_DIR, exist_ok=True)
+    temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    with open(temp_file, 'wb') as f:
+        pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, cache_file)
+    dataset.remove_old_files('aggregates-', cache_file)
+    return cube
+
+
+'''
+loading everything the dashboard needs from the csv file : the cleaned dataframe ( None in chunked ingestion mode ) ,
+its aggregates and the dataset version
+'''
+def load_dashboard_data(csv_file):
+    # the dataset key hashes the csv file and the stop words ( once in the gunicorn master process )
+    version = dataset.dataset_state(csv_file)['key']
+
+    if dataset.INGEST_MODE == 'chunked':
+        return None, cached_aggregates(version, lambda: build_aggregates_from_csv(csv_file)), version
+
+    df = dataset.load_dataset(csv_file, version)
+    return df, cached_aggregates(version, lambda: build_aggregates(df)), version
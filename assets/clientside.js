@@ -0,0 +1,49 @@
+/*
+clientside mode functions ( DASHBOARD_CLIENTSIDE=1 ) making the line chart , the vertical bar chart
+and the word cloud url from the data sent once in the view_data store ( made by clientside.py )
+*/
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        date_chart: function (selectedTopic, viewData) {
+            // the topics menu can be cleared , the chart keeps the last topic
+            var series = viewData && selectedTopic ? viewData.daily[selectedTopic] : undefined;
+            if (!series) {
+                return window.dash_clientside.no_update;
+            }
+            var data = viewData.sentiments.map(function (sentiment) {
+                var daily = series[sentiment.code] || {start: null, counts: []};
+                var x = [];
+                if (daily.start !== null) {
+                    var start = new Date(daily.start + 'T00:00:00Z');
+                    for (var i = 0; i < daily.counts.length; i++) {
+                        x.push(new Date(start.getTime() + i * 86400000).toISOString().slice(0, 10));
+                    }
+                }
+                return {type: 'scatter', mode: 'lines', name: sentiment.name, x: x, y: daily.counts,
+                        marker: {color: sentiment.color}};
+            });
+            return {data: data, layout: viewData.layouts.date_chart};
+        },
+
+        ver_bar_chart: function (selectedLocation, viewData) {
+            if (!viewData) {
+                return window.dash_clientside.no_update;
+            }
+            var locations = viewData.locations[selectedLocation];
+            var figure = {
+                data: [{type: 'bar', x: locations.x, y: locations.y, text: locations.y, textposition: 'auto',
+                        marker: {color: '#1dabdd'}, textfont: {size: 13, color: 'black'}}],
+                layout: viewData.layouts.ver_bar_chart[selectedLocation]
+            };
+            var header = 'Top 5 ' + (selectedLocation === 'city' ? 'Cities' : 'Countries') + ' With Tweets';
+            return [figure, header];
+        },
+
+        word_cloud: function (selectedTopic, viewData) {
+            if (!viewData || !selectedTopic || !viewData.word_clouds[selectedTopic]) {
+                return window.dash_clientside.no_update;
+            }
+            return viewData.word_clouds[selectedTopic];
+        }
+    }
+});
@@ -0,0 +1,171 @@
+'''
+benchmarks for the data preparation steps of the dashboard
+
+run it from the project directory with :
+python benchmark.py
+'''
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from nltk.corpus import stopwords
+import charts
+import dataset
+import downsampling
+import parallel_cleaning
+import search
+import sentiment_model
+import token_store
+
+THIS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+csv_file = os.path.join(THIS_FOLDER, 'twitter_dataset.csv')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+'''
+the old stop words step : the nltk list is loaded again for every tweet ( charts.get_stop_words is cached now )
+'''
+def remove_stop_words(text):
+    stop_words = set(stopwords.words('english'))
+
+    return " ".join([word for word in str(text).split() if word not in stop_words])
+
+
+'''
+the old way of cleaning the text column : five chained .apply passes
+'''
+def chained_cleaning(texts):
+    texts = texts.apply(lambda text: charts.clean_data(text))
+    texts = texts.apply(lambda text: charts.remove_puncts(text))
+    texts = texts.apply(lambda text: remove_stop_words(text))
+    texts = texts.apply(lambda text: charts.processed_tweet(text))
+    texts = texts.apply(lambda text: charts.cleaning_numbers(text))
+    return texts
+
+
+def benchmark_cleaning(texts):
+    old, old_time = timed(chained_cleaning, texts)
+    new, new_time = timed(charts.clean_text_column, texts)
+
+    print('text cleaning of {:,} tweets'.format(len(texts)))
+    print('  chained .apply : {:.3f} s'.format(old_time))
+    print('  single pass    : {:.3f} s ({:.1f}x)'.format(new_time, old_time / new_time))
+    print('  identical output : {}'.format(old.tolist() == new.tolist()))
+
+
+def benchmark_parallel_cleaning(texts, workers=os.cpu_count()):
+    # repeating the tweets so there are enough rows for the processes to be started
+    copies = -(-parallel_cleaning.MIN_PARALLEL_ROWS // len(texts))
+    texts = pd.concat([texts] * copies, ignore_index=True)
+    serial, serial_time = timed(charts.clean_text_column, texts)
+    parallel, parallel_time = timed(parallel_cleaning.clean_text_column, texts, None, workers)
+
+    print('parallel text cleaning of {:,} tweets with {} processes'.format(len(texts), workers))
+    print('  one process : {:.3f} s'.format(serial_time))
+    print('  {} processes : {:.3f} s ({:.1f}x)'.format(workers, parallel_time, serial_time / parallel_time))
+    print('  identical output : {}'.format(serial.tolist() == parallel.tolist()))
+
+
+'''
+size of the line chart json and the time to make it for 3 years of hourly counts
+with all points and downsampled to the points of a 1920 pixels wide browser
+( the browser render time grows with the number of points and isn't measured here )
+'''
+def benchmark_downsampling(years=3, viewport_width=1920):
+    times = pd.date_range('2020-01-01', periods=years * 365 * 24, freq='1h').to_numpy()
+    rng = np.random.default_rng(42)
+    lines = [rng.poisson(20 + 10 * np.sin(np.arange(len(times)) / (24 * 7)) + i) for i in range(3)]
+    budget = downsampling.points_budget(viewport_width)
+
+    print('line chart of 3 lines of {:,} hourly points ( budget {} points )'.format(len(times), budget))
+    for method in [None, 'lttb', 'min_max']:
+        def make_json():
+            fig = go.Figure()
+            for counts in lines:
+                x, y = (times, counts) if method is None else downsampling.downsample(times, counts, budget, method)
+                fig.add_trace(go.Scatter(x=x, y=y, mode='lines'))
+            return pio.to_json(fig)
+
+        payload, seconds = timed(make_json)
+        print('  {:8} : {:>10,} bytes in {:.3f} s'.format(method or 'all', len(payload), seconds))
+
+
+'''
+the tweets search : one pandas scan of the text column against the inverted index ( on the dataset repeated to copies rows )
+'''
+def benchmark_search(df, copies=50, query='runway pilot', topic='Aviation'):
+    df = pd.concat([df] * copies, ignore_index=True)
+    words = query.split()
+
+    def scan():
+        texts = df['text'].astype(str).str.lower()
+        mask = df['topic'] == topic
+        for word in words:
+            mask &= texts.str.contains(r'\b{}\b'.format(word))
+        return int(mask.sum())
+
+    def build():
+        index = search.SearchIndex()
+        index.add(df)
+        return index
+
+    index, build_seconds = timed(build)
+    print('search of "{}" in {} over {:,} tweets ( index built in {:.2f} s )'.format(query, topic, len(df), build_seconds))
+    scanned, scan_seconds = timed(scan)
+    print('  scan  : {:,} tweets in {:.3f} s'.format(scanned, scan_seconds))
+    (found, page), search_seconds = timed(index.search, query, {'topic': [topic]})
+    print('  index : {:,} tweets in {:.3f} s'.format(found, search_seconds))
+
+
+'''
+the sentiment model : trained on part of the tweets , its agreement with the sentiment of the other tweets
+and the number of tweets it scores per second ( on one core )
+'''
+def benchmark_sentiment(df, test_share=0.2, copies=50):
+    test = np.random.default_rng(42).random(len(df)) < test_share
+    model, train_seconds = timed(sentiment_model.SentimentModel.train, df['text'][~test], df['sentiment'][~test])
+    print('sentiment model trained on {:,} tweets in {:.2f} s'.format(int((~test).sum()), train_seconds))
+
+    labels = df['sentiment'][test].to_numpy()
+    predicted = model.predict(df['text'][test])
+    print('  agreement with the dataset sentiment on {:,} tweets : {:.1%}'.format(len(labels), (predicted == labels).mean()))
+    for sentiment, name in charts.sent_dict.items():
+        print('    {:8} : {:.1%} of {:,}'.format(name, (predicted[labels == sentiment] == sentiment).mean(),
+                                              int((labels == sentiment).sum())))
+
+    texts = pd.concat([df['text']] * copies, ignore_index=True)
+    scored, seconds = timed(model.predict, texts)
+    print('  scoring : {:,} tweets in {:.2f} s ( {:,.0f} tweets per second )'.format(len(scored), seconds, len(scored) / seconds))
+
+
+'''
+the token store : time to split the text column once and its memory against lists of python strings
+'''
+def benchmark_token_store(texts):
+    tokens, seconds = timed(token_store.TokenStore, texts)
+    print('token store of {:,} tweets ( {:,} words , {:,} distinct ) made in {:.2f} s'.format(
+        len(tokens), len(tokens.ids), len(tokens.vocabulary), seconds))
+
+    lists, seconds = timed(lambda: [text.split() for text in texts.astype(str)])
+    lists_bytes = sum(sys.getsizeof(words) + sum(sys.getsizeof(word) for word in words) for words in lists)
+    print('  lists of strings : {:>12,} bytes ( split in {:.2f} s )'.format(lists_bytes, seconds))
+    print('  token store      : {:>12,} bytes ( {:.1%} )'.format(tokens.nbytes(), tokens.nbytes() / lists_bytes))
+
+
+if __name__ == '__main__':
+    df = pd.read_csv(csv_file)
+    benchmark_cleaning(df['text'])
+    benchmark_parallel_cleaning(df['text'])
+    benchmark_downsampling()
+    df = dataset.prepare_dataset(df)
+    benchmark_token_store(df['text'])
+    benchmark_search(df)
+    benchmark_sentiment(df)
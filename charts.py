@@ -1,40 +1,67 @@
+import functools
+import os
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import re
 import string
 from nltk.corpus import stopwords
 import nltk
-nltk.download('stopwords')
 from nltk.tokenize import word_tokenize
+import downsampling
+import map_data
 
+THIS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+'''
+nltk corpora are read from a local folder instead of being downloaded when the app starts
+( the NLTK_DATA environment variable or the nltk_data folder in the project directory )
+'''
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA', os.path.join(THIS_FOLDER, 'nltk_data'))
+if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+'''
+folder of custom stop words lists , one <language>.txt file per language with one word per line
+'''
+CUSTOM_STOP_WORDS_DIR = os.path.join(THIS_FOLDER, 'stop_words')
+
+'''
+mapping the language codes of tweets to the nltk stop words corpus names
+'''
+language_names = {'ar': 'arabic', 'da': 'danish', 'de': 'german', 'el': 'greek', 'en': 'english',
+                  'es': 'spanish', 'fi': 'finnish', 'fr': 'french', 'hu': 'hungarian', 'id': 'indonesian',
+                  'it': 'italian', 'nl': 'dutch', 'no': 'norwegian', 'pt': 'portuguese', 'ro': 'romanian',
+                  'ru': 'russian', 'sv': 'swedish', 'tr': 'turkish'}
 
 
 
+
+'''
+mapping sentiment codes to text values and colors
+'''
+sent_dict = {1: 'Negative', 2: 'Neutral', 3: 'Positive'}
+sent_colors = {1: 'red', 2: '#e3a817', 3: 'green'}
+
 '''
 horizontal bar chart
 '''
 
-def create_hor_bar(df):
+def create_hor_bar(aggregates):
     fig=go.Figure()
-    graph_data = df.copy()
-    sent_dict = {'1': 'Negative', '2': 'Neutral', '3': 'Positive'}
-    sent_colors= {'1': 'red', '2': '#e3a817', '3': 'green'}
-    c=3
-    # looping through each filtered data with sentiment and make the barchart and stack all charts
-    for i in range(1,4):
-        data=graph_data[graph_data['sentiment']==str(c)]
-        data=data.groupby('topic',sort=False)['sentiment'].count() # grouping by topic and get count of sentiments for each
-        data.sort_values(inplace=True, ascending=False) # sorting descending
+    # looping through each sentiment and make the barchart and stack all charts
+    for c in (3, 2, 1):
+        data=aggregates.topic_counts(c) # count of sentiments for each topic
+        data=data.sort_values(ascending=False) # sorting descending
 
         # create the bar chart
-        fig.add_trace(go.Bar(name=sent_dict[str(c)], x=data.astype('int64'), y=data.index,
-                             marker_color=sent_colors[str(c)],orientation='h',text=data.astype('int64'),
+        fig.add_trace(go.Bar(name=sent_dict[c], x=data.astype('int64'), y=data.index,
+                             marker_color=sent_colors[c],orientation='h',text=data.astype('int64'),
                textposition='inside', textfont=dict(
                 size=13,
 
             ))
                       )
-        c-=1
 
     fig.update_layout(
             xaxis_title='<b>No. of Sentiments<b>', yaxis_title=None,
@@ -52,10 +79,9 @@ def create_hor_bar(df):
 '''
 vertical bar chart
 '''
-def create_ver_bar(df,location):
-    graph_data = df.copy()
-    graph_data=graph_data.groupby(location,sort=False)['tweetId'].count() # grouping by city or country column and get tweets count for each
-    graph_data.sort_values(inplace=True, ascending=False)
+def create_ver_bar(aggregates,location):
+    graph_data=aggregates.location_counts(location) # tweets count for each city or country
+    graph_data=graph_data.sort_values(ascending=False)
     graph_data = graph_data.nlargest(5)  # gettting the largest 5 countries or cities with tweets
     fig=go.Figure()
     fig.add_trace(go.Bar(x=graph_data.index, y=graph_data.astype('int64'),
@@ -79,36 +105,180 @@ def create_ver_bar(df,location):
     return fig
 
 '''
-Map
+horizontal bar chart of the trending words ( from trending.py file ) ranked by score
+'''
+def create_trending_bar(trending_df):
+    fig=go.Figure()
+    fig.add_trace(go.Bar(x=trending_df['score'], y=trending_df['term'], orientation='h',
+                         marker_color='#1dabdd', text=trending_df['recent'].astype('int64'),
+                         customdata=trending_df['previous'].astype('int64'),
+                         hovertemplate='%{y}<br>score=%{x}<br>last days=%{text}<br>days before=%{customdata}<extra></extra>',
+                         textposition='inside', textfont=dict(
+            size=13,color='black'
+
+        ))
+                  )
+
+    fig.update_layout(
+            xaxis_title='<b>Growth Score<b>', yaxis_title=None,
+            font=dict(size=13, family='Arial', color='black'), hoverlabel=dict(
+                font_size=14, font_family="Rockwell"), plot_bgcolor='#f7f7f7',
+            paper_bgcolor='#f7f7f7',margin=dict(l=0, r=0, t=20, b=0)
+
+        )
+    fig.update_xaxes(showgrid=False, showline=True, zeroline=False, linecolor='black',visible=True)
+    fig.update_yaxes(showgrid=False, showline=False, zeroline=False, linecolor='black',autorange="reversed",visible=True,showticklabels=True)
+
+    # no word is growing in the selected days
+    if not len(trending_df):
+        fig.add_annotation(text='No trending terms', x=0.5, y=0.5, xref='paper', yref='paper', showarrow=False,
+                           font=dict(size=14))
+        fig.update_xaxes(visible=False)
+        fig.update_yaxes(visible=False)
+
+    return fig
+
+'''
+line chart of number of tweets of each sentiment over time for the selected topic ( or 'All Topics' )
+between start and end dates ( the whole history when they are None ) , the resolution ( hour , day or week )
+depends on the length of the range and each line is downsampled to max_points points ( all points when None )
 '''
-def create_countries_map(df):
+def create_date_chart(aggregates,selected_topic,start=None,end=None,max_points=None):
+    fig=go.Figure()
+    dates_index=aggregates.dates_index()
+    resolution=dates_index.resolution(selected_topic,start,end,max_points)
 
-    map_df = df.groupby(['country', 'country_lon', 'country_lat'])['tweetId'].count() # grouping by country and coordinates
+    for i in range(1,4):
+        # getting the count of tweets of each sentiment for each hour , day or week ( of the selected topic or all topics )
+        times,counts=dates_index.query(selected_topic,i,resolution,start,end)
+        times,counts=downsampling.downsample(times,counts,max_points)
+
+        # line chart
+
+        fig.add_trace(
+            go.Scatter(x=times, y=counts, mode='lines', name=sent_dict[i],
+                       marker_color=sent_colors[i]
+                       #, stackgroup='one'
+                       ))
 
-    map_df = map_df.reset_index().sort_values('tweetId', ascending=False)
+    fig.update_layout(
+        xaxis_title='<b>Date<b>', yaxis_title='<b>Number of Tweets<b>',
+        font=dict(size=14, family='Arial', color='black'), hoverlabel=dict(
+            font_size=14, font_family="Rockwell", font_color='black', bgcolor='white'), plot_bgcolor='#f7f7f7',
+        paper_bgcolor='#f7f7f7',
+        xaxis=dict(
+
+            tickwidth=2, tickcolor='#80ced6',
+            ticks="outside",
+            tickson="labels",
+            rangeslider_visible=False
+        ),margin=dict(l=0, r=0, t=30, b=0)
+    )
+    fig.update_xaxes(showgrid=False, showline=True, zeroline=False, linecolor='black')
+    fig.update_yaxes(showgrid=False, showline=True, zeroline=False, linecolor='black')
+
+    # keeping the selected range on the chart and showing the number of tweets of each point
+    if start is not None and end is not None:
+        fig.update_xaxes(range=[start,end])
+    fig.update_yaxes(title_text='<b>Number of Tweets per {}<b>'.format(resolution.capitalize()) if resolution!='day'
+                     else '<b>Number of Tweets<b>')
+    return fig
 
-    map_df['size']=10   # adding size column to be used in map figure
+'''
+Map
+'''
+'''
+the parts of the default plotly template the map uses , the map figure doesn't carry the whole template
+'''
+map_template = go.layout.Template(layout=dict(font=dict(color='#2a3f5f'), hoverlabel=dict(align='left')))
 
-    # creating the map figure with continous color scale that reflects the number of tweets
-    fig = px.scatter_mapbox(map_df, lat="country_lat", lon="country_lon",text='country',custom_data=['country','tweetId'],
-                            size='size',
-                   size_max=12, zoom=0,
-                            labels={'tweetId': '<b>No. Tweets<b>'}
-                           , color="tweetId",color_continuous_scale=px.colors.sequential.Turbo,
-                            hover_data={"country": True,"country_lon": False,"country_lat": False,
-                                        "tweetId": True,'size':False}
-                            )
+'''
+location is 'country' for one point per country or 'city' for the cities ( grouped in hexagons when there are many )
+'''
+def create_countries_map(aggregates, location='country'):
+
+    map_df = map_data.city_points(aggregates) if location == 'city' else None
+    if map_df is None:
+        location = 'country'
+        map_df = map_data.country_points(aggregates) # tweets count by country sorted from the most tweets
+
+    # creating the map figure with only the coordinates , names and tweets counts of the points
+    # and a continous color scale that reflects the number of tweets
+    fig = go.Figure(go.Scattermapbox(lat=map_df['lat'], lon=map_df['lon'], text=map_df['name'], mode='markers+text',
+                                     marker=dict(size=12, color=map_df['tweets'], colorscale=px.colors.sequential.Turbo,
+                                                 colorbar=dict(title='<b>No. Tweets<b>', outlinewidth=0, ticks='')),
+                                     hovertemplate=location + '=%{text}<br><b>No. Tweets<b>=%{marker.color}<extra></extra>'),
+                    layout=dict(template=map_template))
 
     fig.update_layout(mapbox_style='open-street-map', mapbox_center_lon=21.9877132, mapbox_center_lat=38.9953683,
                        mapbox_zoom=0)
     fig.update_layout(margin={"r": 0, "t": 30, "l": 0, "b": 0}, hoverdistance=2, uirevision='func',
                        clickmode='event+select', hovermode='closest',plot_bgcolor='#f7f7f7',
             paper_bgcolor='#f7f7f7')
-    fig.update_geos(fitbounds="locations",scope='world')
 
     return fig
 
 
+'''
+indicator figure of the header boxes
+number takes the format of the number like valueformat or suffix
+'''
+indicator_size=27
+
+def create_indicator(value, **number):
+    fig = go.Figure()
+
+    fig.add_trace(go.Indicator(
+        mode = "number",
+        value = value,
+        number=dict({'font':{'color':'#1dabdd','size':indicator_size}}, **number),
+       domain={'row':0,'column':0}
+    ))
+
+    fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+
+                      )
+
+    return fig
+
+'''
+donut chart of reliability categories percentages
+'''
+def create_donut(aggregates):
+    # creating a dataframe that will be used in donut chart to get percentages of reliability categories
+    dff=aggregates.reliability.sort_index()
+    dff=dff.reset_index()
+
+    # adjusting the order of the reliability categories will be shown on donut chart ( when all 5 are there )
+    if len(dff)==5:
+        temp=dff.loc[0]
+        dff.loc[0]=dff.loc[4]
+        dff.loc[4]=temp
+        temp=dff.loc[1]
+        dff.loc[1]=dff.loc[4]
+        dff.loc[4]=temp
+        temp=dff.loc[2]
+        dff.loc[2]=dff.loc[3]
+        dff.loc[3]=temp
+        temp=dff.loc[1]
+        dff.loc[1]=dff.loc[2]
+        dff.loc[2]=temp
+
+    fig = go.Figure(data=go.Pie(labels=dff['Reliability Categories'], values=dff['tweetId'],hole=.3,showlegend=False,sort=False))
+    fig.update_traces(hoverinfo='label+percent', textinfo='label+percent', textfont_size=14, textfont_family='Arial',
+                      marker=dict(colors=['#009191','#3B98F5','#46FFFF','#1500FF','#A5ECFF'], line=dict(color='#0f2937')),
+                        texttemplate = '<b>%{label}</br></br>%{percent}</b>')
+
+    fig.update_layout(
+        font=dict(size=14, family='Arial', color='black')
+        ,hoverlabel=dict(font_size=14, font_family="Rockwell")
+        , plot_bgcolor='#f7f7f7',
+        paper_bgcolor='#f7f7f7', margin=dict(l=0, r=0, t=20, b=0)
+
+    )
+
+    return fig
+
 
 def clean_data(text):
     # removing HTML special entities (e.g. &amp;)
@@ -137,8 +307,29 @@ def remove_puncts(text):
 
 
 
-def remove_stop_words(text):
-    stop_words = set(stopwords.words('english'))
+'''
+stop words are loaded once per language and kept as a frozenset
+'''
+@functools.lru_cache(maxsize=None)
+def get_stop_words(language='english'):
+    language = language_names.get(language, language)
+
+    # languages missing from the nltk corpus only use their custom list
+    if language in stopwords.fileids():
+        words = set(stopwords.words(language))
+    else:
+        words = set()
+
+    custom_file = os.path.join(CUSTOM_STOP_WORDS_DIR, '{}.txt'.format(language))
+    if os.path.exists(custom_file):
+        with open(custom_file, encoding='utf-8') as f:
+            words.update(line.strip() for line in f if line.strip())
+
+    return frozenset(words)
+
+
+def remove_stop_words(text, language='english'):
+    stop_words = get_stop_words(language)
 
     return " ".join([word for word in str(text).split() if word not in stop_words])
 
@@ -169,3 +360,61 @@ def cleaning_numbers(text):
 def tokenize(text):
     return word_tokenize(text)
 
+
+'''
+version of the cleaning steps , it has to be increased whenever the cleaning output changes
+so the cleaned datasets saved by dataset.py are made again
+'''
+CLEANING_VERSION = 1
+
+
+'''
+single pass cleaning
+
+the same steps as clean_data , remove_puncts , remove_stop_words , processed_tweet and cleaning_numbers
+with the patterns compiled once and all of them applied to each tweet in one loop over the column
+instead of five separate .apply passes ( the output is identical to the chained functions )
+'''
+entities_pattern = re.compile(r'\&\w*;')
+url_pattern = re.compile(r'(https|http)?:\/\/(\w|\.|\/|\?|\=|\&|\%|\-)*\b')
+username_pattern = re.compile(r'@[^\s]+')
+# a run of punctuation or any other single symbol becomes one space ( same as the two remove_puncts substitutions )
+puncts_pattern = re.compile('[' + string.punctuation + r']+|[^\w\s]')
+whitespaces_pattern = re.compile(r'\s\s+')
+short_words_pattern = re.compile(r'\b\w{1,2}\b')
+spaces_pattern = re.compile(r' {2,}')
+apostrophe_pattern = re.compile(r'[’]')
+numbers_pattern = re.compile('[0-9]+')
+
+
+def clean_text(text, stop_words):
+    text = entities_pattern.sub('', text)
+    text = url_pattern.sub('', text)
+    text = username_pattern.sub('', text)
+
+    text = puncts_pattern.sub(' ', text)
+
+    text = " ".join([word for word in text.split() if word not in stop_words])
+
+    text = whitespaces_pattern.sub(' ', text)
+    text = text.lstrip(' ')
+    text = short_words_pattern.sub('', text)
+    text = spaces_pattern.sub(' ', text)
+    text = apostrophe_pattern.sub('', text)
+
+    return numbers_pattern.sub('', text)
+
+
+'''
+languages is an optional column with the language of each tweet , tweets without a language use english stop words
+'''
+def clean_text_column(texts, languages=None):
+    if languages is None:
+        stop_words = get_stop_words('english')
+        cleaned = [clean_text(text, stop_words) for text in texts]
+    else:
+        languages = languages.fillna('english')
+        cleaned = [clean_text(text, get_stop_words(language)) for text, language in zip(texts, languages)]
+
+    return pd.Series(cleaned, index=texts.index, name=texts.name, dtype=object)
+
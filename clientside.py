@@ -0,0 +1,50 @@
+'''
+clientside mode ( DASHBOARD_CLIENTSIDE=1 ) : switching topics and locations happens in the browser
+
+the daily sentiment series of every topic , the top 5 cities and countries and the word cloud urls are sent once
+in a dcc.Store and the functions in assets/clientside.js make the figures from them , so changing the dropdowns
+or radio buttons doesn't send any request to the server
+'''
+import json
+import os
+import plotly.io as pio
+import charts
+
+CLIENTSIDE_MODE = os.environ.get('DASHBOARD_CLIENTSIDE', '0') == '1'
+
+
+'''
+daily counts of each sentiment of a topic as the first day and the list of counts of the following days
+'''
+def daily_series(aggregates, selected_topic):
+    series = {}
+    for sentiment in charts.sent_dict:
+        data = aggregates.daily_counts(selected_topic, sentiment)
+        series[sentiment] = dict(start=data.index[0].strftime('%Y-%m-%d') if len(data) else None,
+                                 counts=data.astype('int64').tolist())
+    return series
+
+
+def top_locations(aggregates, location):
+    data = aggregates.location_counts(location).sort_values(ascending=False).nlargest(5)
+    return dict(x=data.index.tolist(), y=data.astype('int64').tolist())
+
+
+def figure_layout(fig):
+    return json.loads(pio.json.to_json_plotly(fig))['layout']
+
+
+'''
+data of the store , topics includes 'All Topics' and word_cloud_urls maps each topic to its image url
+'''
+def view_data(aggregates, topics, word_cloud_urls):
+    return dict(
+        sentiments=[dict(code=code, name=name, color=charts.sent_colors[code])
+                    for code, name in charts.sent_dict.items()],
+        daily={topic: daily_series(aggregates, topic) for topic in topics},
+        locations={location: top_locations(aggregates, location) for location in ('city', 'country')},
+        word_clouds=word_cloud_urls,
+        # the layouts of the figures made on the server so the browser only adds the data
+        layouts=dict(date_chart=figure_layout(charts.create_date_chart(aggregates, 'All Topics')),
+                     ver_bar_chart={location: figure_layout(charts.create_ver_bar(aggregates, location))
+                                    for location in ('city', 'country')}))
@@ -0,0 +1,161 @@
+'''
+cross filtering : clicking a country on the map or a topic on the horizontal bar chart filters the other charts
+
+each column used for filtering has an inverted index from each of its values to the positions of the rows having it ,
+kept as a sorted array of positions for rare values or as a bitmap ( one bit per row ) for common ones ,
+filtering is then intersecting the positions of the selected values instead of scanning the dataframe
+'''
+import numpy as np
+import pandas as pd
+
+'''
+values on more than 1 row out of BITMAP_RATIO are kept as bitmaps ( smaller than an array of 4 bytes positions )
+'''
+BITMAP_RATIO = 32
+
+'''
+columns that can be filtered
+'''
+filter_columns = ['country', 'topic']
+
+
+class PositionSet:
+    def __init__(self, positions, rows):
+        self.rows = rows
+        if len(positions) * BITMAP_RATIO > rows:
+            mask = np.zeros(rows, dtype=bool)
+            mask[positions] = True
+            self.bitmap, self.positions = np.packbits(mask), None
+        else:
+            self.bitmap, self.positions = None, np.asarray(positions, dtype='int32')
+
+    def to_bitmap(self):
+        if self.bitmap is not None:
+            return self.bitmap
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[self.positions] = True
+        return np.packbits(mask)
+
+    def to_positions(self):
+        if self.positions is not None:
+            return self.positions
+        return np.flatnonzero(np.unpackbits(self.bitmap, count=self.rows)).astype('int32')
+
+    def contains(self, positions):
+        if self.bitmap is not None:
+            return (self.bitmap[positions >> 3] & (np.uint8(128) >> (positions & 7).astype('uint8'))) != 0
+        return np.isin(positions, self.positions, assume_unique=True)
+
+    def intersect(self, other):
+        if self.bitmap is not None and other.bitmap is not None:
+            return from_bitmap(np.bitwise_and(self.bitmap, other.bitmap), self.rows)
+        # testing the positions of the smaller array against the other set
+        small, large = (self, other) if self.positions is not None else (other, self)
+        if large.positions is not None and len(large.positions) < len(small.positions):
+            small, large = large, small
+        return PositionSet(small.positions[large.contains(small.positions)], self.rows)
+
+    def union(self, other):
+        if self.positions is not None and other.positions is not None:
+            return PositionSet(np.union1d(self.positions, other.positions), self.rows)
+        return from_bitmap(np.bitwise_or(self.to_bitmap(), other.to_bitmap()), self.rows)
+
+
+def from_bitmap(bitmap, rows):
+    return PositionSet(np.flatnonzero(np.unpackbits(bitmap, count=rows)), rows)
+
+
+class RowIndex:
+    def __init__(self, df, columns):
+        self.rows = len(df)
+        self.sets = {}  # column -> {value: PositionSet}
+
+        for column in columns:
+            codes, values = pd.factorize(df[column])
+            # positions of the rows sorted by value , split in one group per value ( rows without a value are skipped )
+            order = np.argsort(codes, kind='stable')
+            order = order[np.searchsorted(codes[order], 0):]
+            groups = np.split(order, np.cumsum(np.bincount(codes[codes >= 0], minlength=len(values)))[:-1])
+            self.sets[column] = {value: PositionSet(positions, self.rows) for value, positions in zip(values, groups)}
+
+    '''
+    positions of the rows matching the filters ( a dict of column -> list of values , values of a column are or-ed
+    and columns without values aren't filtered )
+    '''
+    def select(self, filters):
+        selected = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            empty = PositionSet(np.array([], dtype='int32'), self.rows)
+            column_set = empty
+            for value in values:
+                column_set = column_set.union(self.sets[column].get(value, empty))
+            selected = column_set if selected is None else selected.intersect(column_set)
+
+        if selected is None:
+            return np.arange(self.rows)
+        return selected.to_positions()
+
+    '''
+    keeping the positions ( sorted ) of the rows matching the filters , faster than select when there are few positions
+    '''
+    def keep(self, positions, filters):
+        for column, values in filters.items():
+            if not values:
+                continue
+            mask = np.zeros(len(positions), dtype=bool)
+            for value in values:
+                if value in self.sets[column]:
+                    mask |= self.sets[column][value].contains(positions)
+            positions = positions[mask]
+        return positions
+
+
+'''
+parts of a dataset indexed separately : the dataset loaded when the app starts and the parts read while it runs ,
+index(df) makes the index of a part
+
+the newest parts are merged ( and indexed again ) while the part before is at most twice as large so there are
+about log2(rows) parts instead of one per refresh , each new row is indexed about log2(rows) times
+( the first part , the memory mapped dataset , is never merged )
+'''
+class Segments:
+    def __init__(self, index):
+        self.index = index
+        self.parts = []  # (dataframe, index)
+
+    def add(self, df):
+        if self.parts and not len(df):
+            return
+        self.parts.append((df, self.index(df)))
+        while len(self.parts) > 2 and len(self.parts[-2][0]) <= 2 * len(self.parts[-1][0]):
+            newest = self.parts.pop()[0]
+            merged = pd.concat([self.parts[-1][0], newest], ignore_index=True)
+            self.parts[-1] = (merged, self.index(merged))
+
+    def __iter__(self):
+        return iter(self.parts)
+
+    def __len__(self):
+        return len(self.parts)
+
+
+class CrossFilter:
+    def __init__(self, columns=filter_columns):
+        self.columns = columns
+        self.segments = Segments(lambda df: RowIndex(df, self.columns))
+
+    def add(self, df):
+        self.segments.add(df)
+
+    '''
+    rows of the dataset matching the filters
+    '''
+    def rows(self, filters):
+        parts = [df.iloc[index.select(filters)] for df, index in self.segments]
+        # empty parts are left out , concatenating them changes the columns types
+        non_empty = [part for part in parts if len(part)]
+        if len(non_empty) > 1:
+            return pd.concat(non_empty, ignore_index=True)
+        return non_empty[0] if non_empty else parts[0]
@@ -0,0 +1,299 @@
+'''
+reading the twitter dataset and preparing it for the dashboard ( all at once or in chunks )
+
+the cleaned dataframe is saved to an arrow file in the cache folder , the file name is a key made from
+the csv file size , modification time and content hash plus the version of the cleaning code
+so the next app start ( or every other gunicorn worker ) memory maps the ready dataframe instead of cleaning the csv again
+'''
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import pandas as pd
+import charts
+import instrumentation
+import parallel_cleaning
+import sentiment_model
+import token_store
+
+THIS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+'''
+folder where the cleaned dataset files are saved ( can be changed with the DASHBOARD_CACHE_DIR environment variable )
+'''
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', os.path.join(THIS_FOLDER, '.cache'))
+
+
+def file_fingerprint(csv_file):
+    # only the bytes up to the size taken first are hashed so the size matches the hash while rows are appended
+    stat = os.stat(csv_file)
+    sha1 = hashlib.sha1()
+    with open(csv_file, 'rb') as f:
+        remaining = stat.st_size
+        while remaining > 0:
+            block = f.read(min(1024 * 1024, remaining))
+            if not block:
+                break
+            sha1.update(block)
+            remaining -= len(block)
+
+    return dict(size=stat.st_size, mtime=stat.st_mtime_ns, sha1=sha1.hexdigest())
+
+
+'''
+compact column types of the dataset :
+sentiment as int8 codes ( 1 negative , 2 neutral , 3 positive ) , repeated text values as categoricals ,
+counts downcast to the smallest integer type that fits them and coordinates as float32
+'''
+SCHEMA_VERSION = 3
+
+category_columns = ['topic', 'country', 'city', 'Reliability Categories', 'lang']
+count_columns = ['tweet_retweet_count', 'tweet_like_count', 'tweet_reply_count']
+coordinate_columns = ['country_lon', 'country_lat', 'city_lon', 'city_lat']
+
+
+def apply_schema(df):
+    df['sentiment'] = df['sentiment'].astype('int8')
+
+    for column in category_columns:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    for column in count_columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+
+    for column in coordinate_columns:
+        if column in df.columns:
+            df[column] = df[column].astype('float32')
+
+    return df
+
+
+'''
+hash of the stop words of every language the cleaning can use ( the nltk lists and the custom lists
+of the stop_words folder )
+'''
+def stop_words_fingerprint():
+    languages = set(charts.stopwords.fileids())
+    if os.path.isdir(charts.CUSTOM_STOP_WORDS_DIR):
+        languages.update(os.path.splitext(name)[0] for name in os.listdir(charts.CUSTOM_STOP_WORDS_DIR)
+                         if name.endswith('.txt'))
+
+    sha1 = hashlib.sha1()
+    for language in sorted(languages):
+        sha1.update(json.dumps([language, sorted(charts.get_stop_words(language))]).encode())
+    return sha1.hexdigest()
+
+
+def hash_key(key):
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+'''
+key of the csv file , the cleaning code , the stop words and the schema
+'''
+def source_key(csv_file, fingerprint=None):
+    return hash_key(dict(fingerprint or file_fingerprint(csv_file), cleaning_version=charts.CLEANING_VERSION,
+                         stop_words=stop_words_fingerprint(), schema_version=SCHEMA_VERSION))
+
+
+'''
+the key changes when the source key or the sentiment model ( used for tweets without a sentiment ) change ,
+a model trained from the same source ( the one saved the first time the csv file is loaded ) doesn't change it
+so the dataset cached before the model was saved is still used
+'''
+def dataset_key(csv_file, fingerprint=None, source=None):
+    source = source or source_key(csv_file, fingerprint)
+    model_source = sentiment_model.saved_model_source()
+    if model_source is None or model_source == source:
+        return hash_key(dict(source=source, sentiment_model='trained from source'))
+    return hash_key(dict(source=source, sentiment_model=file_fingerprint(sentiment_model.MODEL_FILE)))
+
+
+'''
+name of the environment variable the gunicorn master process puts the dataset state in ( see gunicorn.conf.py ) ,
+the workers are forked from it so they get the key without hashing the csv file and the stop words again ,
+a worker started again after new rows were appended gets the same key and reads those rows as new rows
+'''
+STATE_VARIABLE = 'DASHBOARD_DATASET_STATE'
+
+states = {}  # csv file -> state of its dataset
+
+
+'''
+state of the dataset of a csv file ( made once per process ) : its key , its source key and the size of the csv file
+it is made from ( the rows after that size are new rows read by live_ingest.py )
+'''
+def dataset_state(csv_file):
+    csv_file = os.path.abspath(csv_file)
+    if csv_file not in states:
+        shared = json.loads(os.environ.get(STATE_VARIABLE, '{}'))
+        if shared.get('csv_file') == csv_file:
+            states[csv_file] = shared
+        else:
+            with instrumentation.phase('dataset_key'):
+                fingerprint = file_fingerprint(csv_file)
+                source = source_key(csv_file, fingerprint)
+                states[csv_file] = dict(csv_file=csv_file, key=dataset_key(csv_file, source=source), source=source,
+                                        size=fingerprint['size'])
+    return states[csv_file]
+
+
+'''
+giving the dataset state to the processes started from this one
+'''
+def share_state(csv_file):
+    os.environ[STATE_VARIABLE] = json.dumps(dataset_state(csv_file))
+
+
+'''
+ingestion mode : 'full' reads the whole csv file in a dataframe , 'chunked' reads it in chunks of CHUNK_SIZE rows
+that are only used to build the counts the dashboard needs ( for datasets larger than memory )
+'''
+INGEST_MODE = os.environ.get('DASHBOARD_INGEST_MODE', 'full')
+CHUNK_SIZE = int(os.environ.get('DASHBOARD_CHUNK_SIZE', 100000))
+
+
+'''
+cleaning a dataframe read from the csv file , trained_from is the source key of the csv file when the sentiment
+model can be trained from it ( see sentiment_model.py file , new tweets read while the app runs don't train it )
+'''
+def prepare_dataset(df, trained_from=None):
+    # converting 'created' column type to datetime
+    with instrumentation.phase('parse_dates'):
+        df["created"] = pd.to_datetime(df["created"], infer_datetime_format=True)
+
+    # cleaning text column using functions in charts.py file ( all cleaning steps are applied in one pass ,
+    # in several processes when DASHBOARD_CLEAN_WORKERS is set )
+    with instrumentation.phase('clean_text'):
+        df['text'] = parallel_cleaning.clean_text_column(df['text'], df['lang'] if 'lang' in df.columns else None)
+
+    # scoring the tweets without a sentiment with the model in sentiment_model.py file
+    with instrumentation.phase('score_sentiment'):
+        df = sentiment_model.fill_sentiment(df, trained_from)
+
+    with instrumentation.phase('apply_schema'):
+        return apply_schema(df)
+
+
+'''
+the csv file up to the size its key was made from as a memory map ( the rows appended after that size are read
+as new rows by live_ingest.py , so they are neither missed nor read twice )
+'''
+@contextlib.contextmanager
+def open_csv(csv_file):
+    with open(csv_file, 'rb') as f, mmap.mmap(f.fileno(), dataset_state(csv_file)['size'], access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+'''
+reading the csv file and cleaning it
+'''
+def read_dataset(csv_file):
+    with instrumentation.phase('read_csv'), open_csv(csv_file) as data:
+        df = pd.read_csv(data)
+    return prepare_dataset(df, dataset_state(csv_file)['source'])
+
+
+'''
+training the sentiment model from the tweets of the csv file that have a sentiment , read in chunks
+( only their text is cleaned , the chunks are cleaned again when they are read for the dashboard )
+'''
+def train_sentiment_model(csv_file, source, chunksize=None):
+    def batches():
+        with open_csv(csv_file) as data:
+            for chunk in pd.read_csv(data, chunksize=chunksize or CHUNK_SIZE):
+                if 'sentiment' not in chunk.columns:
+                    return
+                chunk = chunk[chunk['sentiment'].notna()]
+                if len(chunk):
+                    yield (parallel_cleaning.clean_text_column(chunk['text'], chunk['lang'] if 'lang' in chunk.columns else None),
+                           chunk['sentiment'])
+
+    with instrumentation.phase('train_sentiment'):
+        model = sentiment_model.SentimentModel.train_batches(batches(), source)
+    if model is not None:
+        model.save(sentiment_model.MODEL_FILE)
+        sentiment_model.model = model
+
+
+'''
+reading the csv file in chunks and cleaning each one , the sentiment model is trained from the whole file first
+when there is no saved model ( a chunk can have tweets without a sentiment and no tweet with one )
+'''
+def read_dataset_chunks(csv_file, chunksize=None):
+    source = dataset_state(csv_file)['source']
+    if sentiment_model.load_model() is None:
+        train_sentiment_model(csv_file, source, chunksize)
+
+    with open_csv(csv_file) as data:
+        chunks = pd.read_csv(data, chunksize=chunksize or CHUNK_SIZE)
+        while True:
+            with instrumentation.phase('read_csv'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield prepare_dataset(chunk, source)
+
+
+'''
+removing the cache files of older versions of the dataset ( the files named after cache_file are kept )
+'''
+def remove_old_files(prefix, cache_file):
+    for file_name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, file_name)
+        if file_name.startswith(prefix) and not path.startswith(cache_file) and '.tmp' not in file_name:
+            os.remove(path)
+
+
+'''
+saving the dataset as an uncompressed arrow file that can be memory mapped , with the token store of its text
+( token_store.py file ) saved next to it
+'''
+def save_dataset(df, cache_file):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+    # the token store is saved first so a process finding the arrow file also finds the token store
+    token_store.of(df).save(cache_file)
+
+    # writing to a temporary file first so other processes never read a half written file
+    temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    df.to_feather(temp_file, compression='uncompressed')
+    os.replace(temp_file, cache_file)
+
+    remove_old_files('dataset-', cache_file)
+
+
+'''
+reading the dataset from the memory mapped arrow file
+
+the text column stays in the mapped file ( as an arrow backed column ) so all the app processes share the same
+pages of memory instead of each one holding its own copy of the strings , the other columns are small
+'''
+def open_shared_dataset(cache_file):
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(cache_file)).read_all()
+    string_types = {pa.string(): pd.ArrowDtype(pa.string()), pa.large_string(): pd.ArrowDtype(pa.large_string())}
+    return table.to_pandas(split_blocks=True, types_mapper=string_types.get)
+
+
+'''
+getting the cleaned dataset from the cache file if it exists otherwise reading the csv and saving it in the cache
+'''
+def load_dataset(csv_file, key=None):
+    key = key or dataset_state(csv_file)['key']
+    cache_file = os.path.join(CACHE_DIR, 'dataset-{}.arrow'.format(key))
+
+    if not os.path.exists(cache_file):
+        df = read_dataset(csv_file)
+        with instrumentation.phase('save_dataset'):
+            save_dataset(df, cache_file)
+
+    with instrumentation.phase('open_dataset'):
+        df = open_shared_dataset(cache_file)
+        token_store.use_saved(df, cache_file)
+
+    df.attrs['version'] = key
+    return df
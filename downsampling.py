@@ -0,0 +1,88 @@
+'''
+reducing the number of points of the line chart traces before sending them to the browser
+
+lttb ( largest triangle three buckets ) keeps the points that preserve the shape of the line ,
+min_max keeps the lowest and highest point of each bucket ( faster and keeps every peak )
+'''
+import numpy as np
+
+'''
+the viewport width is divided by this to get the number of points of each line ( about one point every 2 pixels ) ,
+rounded up to one of POINTS_BUDGETS so browsers of close widths get the same cached figure
+'''
+PIXELS_PER_POINT = 2
+POINTS_BUDGETS = [300, 500, 800, 1000, 1500]
+
+'''
+the resolution of the line chart ( in time_index.py file ) is chosen so a line has up to OVERSAMPLING times
+the points budget , the downsampling then keeps the shape of the line from these finer points
+'''
+OVERSAMPLING = 4
+
+
+def points_budget(viewport_width):
+    if not viewport_width:
+        return None
+    points = int(viewport_width) // PIXELS_PER_POINT
+    return next((budget for budget in POINTS_BUDGETS if budget >= points), POINTS_BUDGETS[-1])
+
+
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold is None or threshold >= n or threshold < 3:
+        return x, y
+
+    xs = x.astype('int64').astype('float64') if np.issubdtype(x.dtype, np.datetime64) else x.astype('float64')
+    ys = y.astype('float64')
+
+    # the first and last points are kept , the others are split in threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # average point of the next bucket ( the last point for the last bucket )
+        if i + 2 < len(edges):
+            next_x = xs[edges[i + 1]:edges[i + 2]].mean()
+            next_y = ys[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = xs[-1], ys[-1]
+
+        # point of the bucket making the largest triangle with the selected point and the next average
+        areas = np.abs((xs[selected] - next_x) * (ys[start:stop] - ys[selected]) -
+                       (xs[selected] - xs[start:stop]) * (next_y - ys[selected]))
+        selected = start + int(areas.argmax())
+        keep[i + 1] = selected
+
+    return x[keep], y[keep]
+
+
+def min_max(x, y, threshold):
+    n = len(x)
+    if threshold is None or threshold >= n or threshold < 2:
+        return x, y
+
+    buckets = threshold // 2
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    positions = np.arange(n)
+
+    # index of the first lowest and first highest point of each bucket
+    lows_mask = y == np.repeat(np.minimum.reduceat(y, starts), sizes)
+    highs_mask = y == np.repeat(np.maximum.reduceat(y, starts), sizes)
+    lows = np.minimum.reduceat(np.where(lows_mask, positions, n), starts)
+    highs = np.minimum.reduceat(np.where(highs_mask, positions, n), starts)
+
+    keep = np.unique(np.concatenate([lows, highs]))
+    return x[keep], y[keep]
+
+
+methods = dict(lttb=lttb, min_max=min_max)
+
+
+def downsample(x, y, threshold, method='lttb'):
+    return methods[method](x, y, threshold)
@@ -0,0 +1,163 @@
+'''
+cache of the values returned by the callbacks ( figures , image sources , headers )
+
+each value is saved as plotly json under a key made from the callback name , its inputs and the dataset version
+in a bounded in-memory LRU and in a folder on disk that all the app processes share
+so a figure made by one worker is served by the others without making it again
+
+a figure being made ( by a callback or by the background warming of precompute.py ) is made once ,
+the other callbacks asking for it at the same time wait for it instead of making it again
+'''
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import threading
+import plotly.io as pio
+import dataset
+
+'''
+folder of the cached figures and max number of figures kept in memory and on disk
+( can be changed with the DASHBOARD_FIGURE_CACHE_SIZE environment variable )
+'''
+FIGURES_DIR = os.path.join(dataset.CACHE_DIR, 'figures')
+MAX_ENTRIES = int(os.environ.get('DASHBOARD_FIGURE_CACHE_SIZE', 256))
+
+
+class FigureCache:
+    def __init__(self, folder, max_entries):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.version = None  # version of the dataset the figures are made from
+        self.memory = collections.OrderedDict()
+        self.stats = collections.Counter(hits=0, disk_hits=0, misses=0)
+        self.pending = {}  # key -> future of the figure being made
+        self.lock = threading.Lock()
+
+    def key(self, name, args):
+        return hashlib.sha1(json.dumps([name, self.version, args], default=str).encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return self.memory[key]
+
+        path = os.path.join(self.folder, key + '.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+
+        with self.lock:
+            self.stats['disk_hits'] += 1
+            self.remember(key, text)
+        return text
+
+    def set(self, key, text):
+        with self.lock:
+            self.remember(key, text)
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, key + '.json')
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        self.prune_folder()
+
+    def remember(self, key, text):
+        self.memory[key] = text
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    # removing the least recently written files when the folder has more than max_entries figures
+    def prune_folder(self):
+        files = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith('.json')]
+        if len(files) <= self.max_entries:
+            return
+
+        # files removed by another process at the same time are skipped
+        times = {}
+        for path in files:
+            try:
+                times[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+        files = sorted(times, key=times.get)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    '''
+    True when the figure of a key is cached in memory or on disk
+    '''
+    def ready(self, key):
+        with self.lock:
+            if key in self.memory:
+                return True
+        return os.path.exists(os.path.join(self.folder, key + '.json'))
+
+    '''
+    the future of the figure of a key and True when the caller has to make it ,
+    False when it is already being made and the caller only waits for it
+    '''
+    def claim(self, key):
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key], False
+            future = self.pending[key] = concurrent.futures.Future()
+            return future, True
+
+    def release(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+
+
+cache = FigureCache(FIGURES_DIR, MAX_ENTRIES)
+
+
+'''
+decorator caching the value a callback returns for each combination of its inputs
+'''
+def memoize(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = cache.key(name, args)
+            text = cache.get(key)
+            if text is not None:
+                return json.loads(text)
+
+            future, owner = cache.claim(key)
+            if not owner:
+                return json.loads(future.result())
+
+            try:
+                value = func(*args)
+                text = pio.json.to_json_plotly(value)
+                cache.set(key, text)
+                future.set_result(text)
+            except BaseException as error:
+                future.set_exception(error)
+                raise
+            finally:
+                cache.release(key)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,23 @@
+'''
+gunicorn settings to run the dashboard with several workers :
+gunicorn -c gunicorn.conf.py main:server
+
+the cleaned dataset and its aggregates are saved in the cache folder once by the gunicorn master process
+before the workers start , every worker then memory maps the same dataset file and loads the saved aggregates
+so memory doesn't grow with the number of workers and a new worker starts almost instantly
+( the dataset key is given to the workers too so they don't hash the csv file again )
+'''
+import os
+
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8044')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('DASHBOARD_THREADS', 4))
+
+
+def on_starting(server):
+    import aggregates
+    import dataset
+
+    csv_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'twitter_dataset.csv')
+    aggregates.load_dashboard_data(csv_file)
+    dataset.share_state(csv_file)
@@ -0,0 +1,83 @@
+'''
+serving the logo and word cloud images from memory
+
+the png files are read and gzip compressed once , then served from a flask route with an ETag and
+Cache-Control headers so the browser ( or a proxy ) keeps them , the callbacks only return the image url
+'''
+import glob
+import gzip
+import hashlib
+import os
+from urllib.parse import quote
+from flask import Response, abort, request
+
+'''
+the image urls have the image hash in them so the browser can keep them for a year
+'''
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ImageStore:
+    def __init__(self):
+        self.images = {}
+        # function adding an image asked for before it is in the store or with another version than the one
+        # in the store ( set by the app )
+        self.missing = None
+
+    def add(self, name, data):
+        compressed = gzip.compress(data, compresslevel=9)
+        self.images[name] = dict(data=data, etag=hashlib.sha1(data).hexdigest(),
+                                 # keeping the compressed copy only if it is smaller
+                                 gzip=compressed if len(compressed) < len(data) else None)
+
+    def add_file(self, path, name=None):
+        with open(path, 'rb') as f:
+            self.add(name or os.path.basename(path), f.read())
+
+    def add_folder(self, folder):
+        for path in glob.glob(os.path.join(folder, '*.png')):
+            self.add_file(path)
+
+    def __contains__(self, name):
+        return name in self.images
+
+    def url(self, name):
+        return '/images/{}?v={}'.format(quote(name), self.images[name]['etag'][:12])
+
+    '''
+    url of an image that isn't in the store yet , version is used instead of the image hash
+    ( the image is added by the missing function when the browser asks for it )
+    '''
+    def pending_url(self, name, version):
+        return '/images/{}?v={}'.format(quote(name), quote(str(version)))
+
+    def response(self, name):
+        outdated = name not in self.images or request.args.get('v') != self.images[name]['etag'][:12]
+        if outdated and self.missing is not None:
+            self.missing(name)
+        if name not in self.images:
+            abort(404)
+        image = self.images[name]
+
+        # each encoding of the image has its own etag so a cache never gives the gzip bytes for the identity etag
+        if image['gzip'] is not None and 'gzip' in request.accept_encodings:
+            response = Response(image['gzip'], mimetype='image/png')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(image['etag'] + '-gzip')
+        else:
+            response = Response(image['data'], mimetype='image/png')
+            response.set_etag(image['etag'])
+
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        # answering with 304 not modified when the browser already has this version
+        return response.make_conditional(request)
+
+
+'''
+adding the /images/<name> route to the flask server
+'''
+def register_routes(server, store):
+    @server.route('/images/<path:name>')
+    def image(name):
+        return store.response(name)
@@ -0,0 +1,192 @@
+'''
+timings of the startup phases and of the dash callbacks , shown in prometheus text format on the /metrics route
+
+startup phases ( reading the csv file , parsing dates , cleaning , building the counts and figures ... ) are timed with
+the phase context manager , the callbacks are timed around the dash update requests so every callback is measured
+( duration , size of the response and change of the process memory ) without changing the callback functions
+
+when DASHBOARD_PROFILE_DIR is set every callback call is profiled with cProfile and saved in that folder
+as <callback>-<time>.prof ( read it with python -m pstats or snakeviz )
+
+the metrics are kept for each process , with gunicorn every worker shows its own metrics
+
+the /metrics route only answers requests from the same machine ( the dashboard listens on every address ) ,
+set DASHBOARD_METRICS_PUBLIC=1 to answer any address ( behind a reverse proxy the proxy address is the one checked )
+'''
+import collections
+import contextlib
+import cProfile
+import ipaddress
+import os
+import threading
+import time
+from flask import Response, abort, g, request
+
+PROFILE_DIR = os.environ.get('DASHBOARD_PROFILE_DIR')
+METRICS_PUBLIC = os.environ.get('DASHBOARD_METRICS_PUBLIC', '0') == '1'
+
+'''
+upper bounds in seconds of the callbacks duration histogram buckets
+'''
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+lock = threading.Lock()
+phases = collections.OrderedDict()  # phase -> [seconds, runs]
+callbacks = collections.OrderedDict()  # callback -> dict of the callback metrics
+
+
+'''
+resident memory of the process in bytes ( 0 where /proc isn't available )
+'''
+def memory_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def record_phase(name, seconds):
+    with lock:
+        totals = phases.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+'''
+timing the code in a with block as a phase , the times of a phase that runs several times are added
+'''
+@contextlib.contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def record_callback(name, seconds, payload, memory_delta, error):
+    with lock:
+        metrics = callbacks.get(name)
+        if metrics is None:
+            metrics = callbacks[name] = dict(calls=0, errors=0, seconds=0.0, payload=0, memory_delta=0,
+                                             buckets=[0] * len(DURATION_BUCKETS))
+        metrics['calls'] += 1
+        metrics['errors'] += int(error)
+        metrics['seconds'] += seconds
+        metrics['payload'] += payload
+        metrics['memory_delta'] += memory_delta
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                metrics['buckets'][i] += 1
+
+
+'''
+name of the callback function of a dash update request ( its output when the function has no name )
+'''
+def callback_name(app):
+    body = request.get_json(silent=True) or {}
+    output = body.get('output', '')
+    func = app.callback_map.get(output, {}).get('callback')
+    return getattr(func, '__name__', output)
+
+
+'''
+True when the request comes from the same machine
+'''
+def is_local_request():
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+'''
+all metrics in prometheus text format , extra is a dict of name -> ( help , { label values : value } ) added to them
+'''
+def prometheus_text(extra=None):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for labels, value in samples:
+            label_text = ','.join('{}="{}"'.format(key, escape(label)) for key, label in labels)
+            lines.append('{}{} {}'.format(name, '{' + label_text + '}' if label_text else '', value))
+
+    with lock:
+        metric('dashboard_phase_seconds_total', 'counter', 'Seconds spent in each startup or data loading phase',
+               [((('phase', name),), round(seconds, 6)) for name, (seconds, runs) in phases.items()])
+        metric('dashboard_phase_runs_total', 'counter', 'Number of times each phase ran',
+               [((('phase', name),), runs) for name, (seconds, runs) in phases.items()])
+
+        # the buckets counts are already cumulative ( a call is counted in every bucket its duration is under )
+        lines.append('# HELP dashboard_callback_duration_seconds Duration of the dash callbacks requests')
+        lines.append('# TYPE dashboard_callback_duration_seconds histogram')
+        for name, metrics in callbacks.items():
+            for bound, count in zip(DURATION_BUCKETS + ['+Inf'], metrics['buckets'] + [metrics['calls']]):
+                lines.append('dashboard_callback_duration_seconds_bucket{{callback="{}",le="{}"}} {}'.format(
+                    escape(name), bound, count))
+        for name, metrics in callbacks.items():
+            lines.append('dashboard_callback_duration_seconds_sum{{callback="{}"}} {}'.format(escape(name), round(metrics['seconds'], 6)))
+            lines.append('dashboard_callback_duration_seconds_count{{callback="{}"}} {}'.format(escape(name), metrics['calls']))
+
+        metric('dashboard_callback_errors_total', 'counter', 'Number of dash callbacks requests that failed',
+               [((('callback', name),), metrics['errors']) for name, metrics in callbacks.items()])
+        metric('dashboard_callback_payload_bytes_total', 'counter', 'Bytes of the dash callbacks responses',
+               [((('callback', name),), metrics['payload']) for name, metrics in callbacks.items()])
+        metric('dashboard_callback_memory_delta_bytes_total', 'counter',
+               'Change of the process resident memory during the dash callbacks requests',
+               [((('callback', name),), metrics['memory_delta']) for name, metrics in callbacks.items()])
+
+    metric('dashboard_memory_bytes', 'gauge', 'Resident memory of the process', [((), memory_bytes())])
+
+    for name, (help_text, samples) in (extra or {}).items():
+        metric(name, 'counter', help_text, [(tuple(labels), value) for labels, value in samples.items()])
+
+    return '\n'.join(lines) + '\n'
+
+
+'''
+timing the dash update requests of app and adding the /metrics route to server ,
+extra is a function returning more metrics ( see prometheus_text )
+'''
+def register(server, app, extra=None):
+    update_path = app.config.routes_pathname_prefix + '_dash-update-component'
+
+    @server.before_request
+    def start_callback():
+        if request.path != update_path:
+            return
+        g.callback_start = (time.perf_counter(), memory_bytes())
+        if PROFILE_DIR:
+            g.callback_profile = cProfile.Profile()
+            g.callback_profile.enable()
+
+    @server.after_request
+    def end_callback(response):
+        if request.path != update_path or 'callback_start' not in g:
+            return response
+        start, memory = g.callback_start
+        seconds = time.perf_counter() - start
+        name = callback_name(app)
+
+        if PROFILE_DIR and 'callback_profile' in g:
+            g.callback_profile.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            g.callback_profile.dump_stats(os.path.join(PROFILE_DIR, '{}-{}.prof'.format(name, time.time_ns())))
+
+        # callbacks raising PreventUpdate answer 204 without a body
+        record_callback(name, seconds, response.calculate_content_length() or 0, memory_bytes() - memory,
+                        response.status_code >= 500)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        if not METRICS_PUBLIC and not is_local_request():
+            abort(404)
+        return Response(prometheus_text(extra() if extra else None), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,187 @@
+'''
+reading tweets added to the dataset while the app is running
+
+new rows appended to the csv file ( and new csv files put in a spool folder ) are read , cleaned and
+given to the listeners ( like the aggregates update ) so refreshing costs time only for the new rows
+
+the read position only moves after the rows are cleaned and every listener got them , rows that fail are read again
+on the next check and a listener that failed gets them again without giving them twice to the ones that didn't ,
+rows that still fail after MAX_ATTEMPTS checks ( a malformed row ) are skipped and logged so the next rows are read
+
+the csv file is read from the size it had when the dataset key was made ( see dataset.py ) so no row is missed
+between loading the dataset and starting to read new rows
+
+each app process ( every gunicorn worker ) keeps its own counts so it reads the new rows itself in a background
+thread every REFRESH_SECONDS seconds , all the processes read the same files so they show the same tweets
+( and the same data version ) at most REFRESH_SECONDS seconds apart
+'''
+import glob
+import io
+import logging
+import os
+import re
+import threading
+import time
+import pandas as pd
+import dataset
+
+logger = logging.getLogger(__name__)
+
+'''
+seconds between two checks for new rows ( 0 turns the refresh off ) and the optional spool folder
+( can be changed with DASHBOARD_REFRESH_SECONDS and DASHBOARD_SPOOL_DIR environment variables )
+'''
+REFRESH_SECONDS = int(os.environ.get('DASHBOARD_REFRESH_SECONDS', 60))
+SPOOL_DIR = os.environ.get('DASHBOARD_SPOOL_DIR')
+
+'''
+number of checks new rows can fail before they are skipped
+'''
+MAX_ATTEMPTS = 3
+
+quote_or_newline = re.compile(b'["\\n]')
+
+
+'''
+end position of the last complete row in data ( new lines inside quoted text don't end a row )
+'''
+def complete_rows_end(data):
+    end = 0
+    in_quotes = False
+    for match in quote_or_newline.finditer(data):
+        if match.group() == b'"':
+            in_quotes = not in_quotes
+        elif not in_quotes:
+            end = match.end()
+    return end
+
+
+class CsvTailer:
+    def __init__(self, csv_file, spool_dir=None, offset=None):
+        self.csv_file = csv_file
+        self.spool_dir = spool_dir
+        self.columns = list(pd.read_csv(csv_file, nrows=0).columns)
+        # rows before this position were already loaded when the app started
+        self.offset = os.path.getsize(csv_file) if offset is None else offset
+        self.spooled = set(self.spool_files())
+        self.rows = 0  # number of new rows read since the app started
+        self.listeners = []
+        self.pending = None  # batch of new rows that failed ( see read_new_rows )
+        self.failures = 0  # number of failed checks of the pending batch
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def spool_files(self):
+        if not self.spool_dir:
+            return []
+        return sorted(glob.glob(os.path.join(self.spool_dir, '*.csv')))
+
+    '''
+    adding a function that is called with each dataframe of new cleaned rows
+    '''
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    '''
+    complete rows appended to the csv file after the read position and the position after them
+    ( None when there are none )
+    '''
+    def read_appended_data(self):
+        size = os.path.getsize(self.csv_file)
+        if size <= self.offset:
+            return None, self.offset
+
+        with open(self.csv_file, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+
+        # a row that is still being written is read on the next check
+        end = complete_rows_end(data)
+        if end == 0:
+            return None, self.offset
+        return data[:end], self.offset + end
+
+    '''
+    reading the new rows and giving them to the listeners , returns the number of new rows
+    ( 0 when there are none or they failed , they are given again on the next call )
+    '''
+    def poll(self):
+        with self.lock:
+            try:
+                if self.pending is None:
+                    self.pending = self.read_new_rows()
+                    if self.pending is None:
+                        return 0
+
+                batch = self.pending
+                if batch['rows'] is None:
+                    batch['rows'] = self.prepare(batch)
+                while batch['listeners']:
+                    batch['listeners'][0](batch['rows'])
+                    batch['listeners'].pop(0)
+            except Exception:
+                self.failures += 1
+                if self.failures < MAX_ATTEMPTS:
+                    logger.exception('reading the new rows of %s failed ( attempt %d of %d ) , trying again on the '
+                                     'next check', self.csv_file, self.failures, MAX_ATTEMPTS)
+                    return 0
+                logger.exception('skipping the new rows of %s from byte %d to %d and the spool files %s after %d '
+                                 'failed attempts', self.csv_file, batch['start'], batch['offset'], batch['paths'],
+                                 self.failures)
+                self.commit(batch, 0)
+                return 0
+
+            return self.commit(batch, len(batch['rows']))
+
+    '''
+    moving the read position after a batch ( given to the listeners or skipped )
+    '''
+    def commit(self, batch, rows):
+        self.pending = None
+        self.failures = 0
+        self.offset = batch['offset']
+        self.spooled.update(batch['paths'])
+        self.rows += rows
+        return rows
+
+    '''
+    the new data to read as a batch : the bytes appended to the csv file , the spool files , the cleaned rows
+    ( made by prepare ) and the listeners still to call ( None when there is nothing new )
+    '''
+    def read_new_rows(self):
+        data, offset = self.read_appended_data()
+        paths = [path for path in self.spool_files() if path not in self.spooled]
+        if data is None and not paths:
+            return None
+        return dict(start=self.offset, offset=offset, data=data, paths=paths, rows=None, listeners=list(self.listeners))
+
+    def prepare(self, batch):
+        frames = [] if batch['data'] is None else [pd.read_csv(io.BytesIO(batch['data']), header=None, names=self.columns)]
+        frames += [pd.read_csv(path) for path in batch['paths']]
+
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            # empty spool files are done too
+            batch['listeners'] = []
+            return frames
+        return dataset.prepare_dataset(pd.concat(frames, ignore_index=True))
+
+    '''
+    checking for new rows every seconds seconds in a background thread , on_new_rows is called after new rows
+    were given to the listeners
+    '''
+    def start(self, seconds, on_new_rows=None):
+        if not seconds or self.thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(seconds)
+                if self.poll() and on_new_rows is not None:
+                    try:
+                        on_new_rows()
+                    except Exception:
+                        logger.exception('updating the dashboard after new rows failed')
+
+        self.thread = threading.Thread(target=run, name='live-ingest', daemon=True)
+        self.thread.start()
@@ -18,12 +18,12 @@ dash-bootstrap-components : dash-bootstrap-components is a library of Bootstrap
 
 flask : used to handle server side operations of dash app as dash is written on the top of flask
 
-base64 : used to encode and decode data like images
+pyarrow : required , used to split the words of the tweets and to save the cleaned dataset as a memory mapped arrow file
 
 os : provides functions for interacting with the operating system
 
 to install all packages with pip use this command :
-pip install dash plotly dash-bootstrap-components flask pandas
+pip install dash plotly dash-bootstrap-components flask pandas nltk pyarrow wordcloud
 ######
 
 ######
@@ -31,33 +31,118 @@ Project files:
 
 main.py : where the main dash app runs from and front end and server side code is written
 
+word_clouds.py : where the word cloud images of topics without a ready image are made in background processes
+from the words counts of each topic and cached for each dataset version
+
+live_ingest.py : where new rows appended to the csv file ( or csv files put in the DASHBOARD_SPOOL_DIR folder )
+are read while the app runs so the indicators and charts are refreshed every DASHBOARD_REFRESH_SECONDS seconds
+
+time_index.py : where the hourly , daily and weekly counts of tweets used by the line chart are kept sorted by date
+so a range of dates is cut from them quickly
+
+downsampling.py : where the lines of the line chart are downsampled ( lttb or min-max ) to a number of points
+that depends on the browser width
+
+clientside.py : where the data of the clientside mode ( DASHBOARD_CLIENTSIDE=1 ) is made , in that mode switching topics
+and locations happens in the browser with the functions in assets/clientside.js
+
+images.py : where the logo and word cloud images are loaded in memory once and served from the /images route
+with caching headers
+
+figure_cache.py : where the figures returned by the callbacks are cached in memory and on disk for each dataset version
+( the hits and misses of the cache are shown in /cache_stats )
+
+parallel_cleaning.py : where the text column is cleaned in several processes ( DASHBOARD_CLEAN_WORKERS ) with the
+same result as cleaning it in one process
+
+cross_filter.py : where the rows of each country and topic are indexed so clicking a country on the map or a topic
+on the horizontal bar chart filters the other charts and indicators without scanning the dataframe
+
+search.py : where the words of the cleaned tweets are indexed for the tweets search table ( words , AND / OR
+and prefix* queries filtered by topic , sentiment and country )
+
+precompute.py : where the figures of the views shown when the page opens and of every topic are made in background
+threads when the app starts ( from the most requested topic ) so choosing a topic doesn't wait for its figures
+
+trending.py : where the words used much more in the last days than in the days before are found from the words counts
+of each topic and day , for the trending terms bar chart next to the line chart
+
+map_data.py : where the points of the map are made from the tweets counts by location , one point per country
+or per city ( nearby cities are grouped in hexagons when there are more than DASHBOARD_MAP_MAX_POINTS of them )
+
+instrumentation.py : where the startup phases and the callbacks are timed , the metrics are shown in prometheus
+text format in /metrics ( and every callback call is profiled with cProfile when DASHBOARD_PROFILE_DIR is set )
+
+sentiment_model.py : where the sentiment of tweets without one is scored with a hashed naive bayes model
+trained from the tweets that have one ( python sentiment_model.py trains it from twitter_dataset.csv )
+
+token_store.py : where the words of the cleaned tweets are split once and kept as integer ids with a vocabulary ,
+used by the words counts of the word clouds , the search and the sentiment model
+
+aggregates.py : where tweets are counted by topic , sentiment , day and location once so the charts use these counts
+
+dataset.py : where the csv file is read , cleaned and cached as a memory mapped arrow file so next starts of the app
+( and all the gunicorn workers ) load it faster
+( or read in chunks with DASHBOARD_INGEST_MODE=chunked for datasets larger than memory )
+
 charts.py : where a functions that generate different kind of charts is written that main.py file use and also some other text cleanining functions
 
 twitter_dataset.csv : the file where all te=witter data used exist in
 
-assets folder : its very important as all the .css files used for custom styling exists there and the folder must exist in project directory
+assets folder : its very important as all the .css and .js files used for custom styling exists there and the folder must exist in project directory
 in order to make these custom styles appears ( note that these styles are extra ones beside the main styles generate from python code in
 the components style parameter )
 
+gunicorn.conf.py : gunicorn settings to run the app with several workers ( gunicorn -c gunicorn.conf.py main:server ) ,
+the dataset is prepared once in the gunicorn master process and shared by the workers
+
+benchmark.py : a script that times the text cleaning of twitter_dataset.csv with the old chained .apply functions
+against the single pass charts.clean_text_column and checks that both give the same output
+
+nltk_data folder : local copy of the nltk stopwords corpus ( nltk_data/corpora/stopwords ) , the app doesn't download it
+when it starts so it has to be copied there once ( or pointed to with the NLTK_DATA environment variable )
+with : python -m nltk.downloader -d nltk_data stopwords
+
+stop_words folder : optional custom stop words lists , one <language>.txt file per language with one word per line
+that are added to the nltk stop words of that language
+
 logo.png: the logo image used in app
 
 All Topics.png , Aviation.png , Cristiano ronaldo.png , Gun control.png , Housing.png , Military.png , Rehab.png :
 all these are images produced by wordcloud library and used in app to be read directly instead of repeating wordcloud code every time
-so that saves processing time
+so that saves processing time ( images of other topics are made by word_clouds.py file )
 
 
 '''
+import time
+startup_start=time.perf_counter()
+
 import dash
 from dash import dcc
 from dash import html
+from dash import dash_table
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input,Output
-import pandas as pd
-import base64
+from dash.dependencies import Input,Output,State,ClientsideFunction
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
-from flask import Flask
+from flask import Flask,jsonify,request
 import os
+import functools
+import threading
 import charts
+import dataset
+import aggregates
+import figure_cache
+import images
+import word_clouds
+import live_ingest
+import clientside
+import downsampling
+import cross_filter
+import search
+import trending
+import precompute
+import instrumentation
 
 '''
 making flask server instance to be used as argument in dash app instance
@@ -125,706 +210,1096 @@ db_header_text=  dbc.Col([ header_text] ,
         md=dict(size=8,offset=0), lg=dict(size=8,offset=0), xl=dict(size=8,offset=0))
 
 '''
-encoding our app logo image and creating image component where the encoded image exists in
-'''
-encoded = base64.b64encode(open(logo_file, 'rb').read())
-logo_img=html.Div( html.Img(src='data:image/jpg;base64,{}'.format(encoded.decode()), id='logo_img',className='mylogo'
+the logo and word cloud images are kept in memory ( using images.py file ) and served from the /images route
+so the browser can cache them instead of receiving them encoded in every response ( they are read with the data )
+'''
+image_store=images.ImageStore()
+images.register_routes(server,image_store)
+
+'''
+##### loading the data
+
+the data is loaded when the dashboard is first used ( the first /Dashboard page or dash request this process answers )
+instead of when main.py is imported , so the server listens at once , every gunicorn worker loads it on its own first
+request and main.py can be imported by tools and tests without reading the dataset
+
+reading our csv file and cleaning it ( using functions in dataset.py file , the cleaned dataframe is cached
+in the .cache folder so it is only made again when the csv file or the cleaning code changes )
+and counting tweets by topic , sentiment , day and location once ( using aggregates.py file ) so the callbacks
+only slice these counts instead of grouping the whole dataframe , the counts are cached in the .cache folder too
+
+when the app runs with gunicorn ( gunicorn.conf.py ) the cache files are made once before the workers start
+and every worker memory maps the same dataset file instead of holding its own copy
+
+in chunked ingestion mode the csv file is read in chunks that are only used to build the counts
+so the whole dataframe is never in memory
+'''
+df=None
+cube=None
+dataset_version=None
+tailer=None
+row_index=None
+search_index=None
+data_loaded=False
+data_lock=threading.Lock()
+
+def load_data():
+    global df,cube,dataset_version,tailer,row_index,search_index,data_loaded
+    with data_lock:
+        if data_loaded:
+            return
+        load_start=time.perf_counter()
+
+        '''
+        loading our logo and word cloud images in memory once ( they are served from the /images route )
+        '''
+        image_store.add_folder(THIS_FOLDER)
 
-                  )
-                   ,style=dict(paddingTop='2vh',paddingLeft='2vw',paddingBottom='0.5vh'))
+        df,cube,dataset_version= aggregates.load_dashboard_data(csv_file)
+
+        '''
+        the callbacks figures are cached ( using figure_cache.py file ) for the version of the dataset loaded
+        '''
+        figure_cache.cache.version=dataset_version
+        word_clouds.renderer.set_version(dataset_version)
 
-'''
-styling the width of app logo image in different screen sizes
-'''
-db_logo_img=dbc.Col([ logo_img] ,
-        xs=dict(size=3,offset=0), sm=dict(size=3,offset=0),
-        md=dict(size=2,offset=0), lg=dict(size=2,offset=0), xl=dict(size=2,offset=0))
+        '''
+        checking for new tweets added to the csv file ( or the spool folder ) while the app runs ( using live_ingest.py file ) ,
+        only the new rows are cleaned and added to the tweets counts
+        '''
+        tailer=live_ingest.CsvTailer(csv_file,live_ingest.SPOOL_DIR,dataset.dataset_state(csv_file)['size'])
+        tailer.subscribe(cube.update)
+
+        '''
+        indexing the rows of each country and topic ( using cross_filter.py file ) for filtering the charts by the country
+        clicked on the map or the topic clicked on the horizontal bar chart , new tweets are indexed when they are read
+        ( in chunked ingestion mode there is no dataframe to filter so the charts aren't filtered )
+        '''
+        row_index=None
+        if df is not None:
+            row_index=cross_filter.CrossFilter()
+            with instrumentation.phase('cross_filter_index'):
+                row_index.add(df)
+            tailer.subscribe(row_index.add)
 
-'''
-reading our csv file 
-'''
-df= pd.read_csv(csv_file)
+        '''
+        indexing the words of the tweets for the tweets search ( using search.py file ) , new tweets are indexed when they are read
+        ( the search isn't shown in chunked ingestion mode )
+        '''
+        search_index=None
+        if df is not None:
+            search_index=search.SearchIndex()
+            with instrumentation.phase('search_index'):
+                search_index.add(df)
+            tailer.subscribe(search_index.add)
 
-'''
-converting 'created' column type to datetime
-'''
-df["created"]= pd.to_datetime(df["created"],infer_datetime_format=True )
+        '''
+        starting to make the images of the topics that don't have one ( from the most requested topic )
+        '''
+        for topic in precompute.scheduler.rank_topics([option['value'] for option in topic_options()]):
+            if '{}.png'.format(topic) not in image_store:
+                word_clouds.renderer.submit(topic,cube.term_counts(topic))
 
-'''
-converting 'sentiment' column type to string
-'''
-df['sentiment']=df['sentiment'].astype(str)
+        '''
+        making the figures of every topic in the background ( warm_views below )
+        '''
+        warm_views(figure_cache.cache.version)
+
+        '''
+        reading the new tweets in the background of this process every DASHBOARD_REFRESH_SECONDS seconds
+        '''
+        tailer.start(live_ingest.REFRESH_SECONDS,new_rows_read)
+
+        instrumentation.record_phase('load_data',time.perf_counter()-load_start)
+        data_loaded=True
 
 '''
-cleaning text column using functions in charts.py file
+loading the data before the first callback ( or image request ) this process answers ,
+the page itself and the dash scripts are served without waiting for it
 '''
-df['text']=df['text'].apply(lambda text :charts.clean_data(text) )
-df['text']=df['text'].apply(lambda text :charts.remove_puncts(text) )
-df['text']=df['text'].apply(lambda text :charts.remove_stop_words(text) )
-df['text']=df['text'].apply(lambda text :charts.processed_tweet(text) )
-df['text']=df['text'].apply(lambda text :charts.cleaning_numbers(text) )
-
+@server.before_request
+def load_data_first():
+    if data_loaded:
+        return
+    if request.path==app.config.routes_pathname_prefix+'_dash-update-component' or request.path.startswith('/images/'):
+        load_data()
+
 '''
-creating the header of number of tweets box
+the filters are kept in the cross_filter store as { column : [ selected values ] }
 '''
-tweets_num_text= html.Div(html.H1('Total Number of Tweets',className= 'info-header',id='tweets_num_text',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict( textAlign="center", width='100%'))
+no_filters={column:[] for column in cross_filter.filter_columns}
+
+'''
+getting the tweets counts of the rows matching the filters ( all tweets counts when nothing is selected ) ,
+exclude is the column of the chart itself so it still shows all of its values
+'''
+def filtered_cube(filters,data_version,exclude=None):
+    filters=tuple((column,tuple(values)) for column,values in sorted((filters or no_filters).items())
+                  if values and column!=exclude)
+    return filtered_counts(filters,data_version)
+
+@functools.lru_cache(maxsize=32)
+def filtered_counts(filters,data_version):
+    if not filters or row_index is None:
+        return cube
+    return aggregates.TweetAggregates().update(row_index.rows(dict(filters)),terms=False)
 
 '''
-getting total no. tweets from the dataframe
+gettng a unique list of topics from the tweets counts and inserting All Topics value in the list
 '''
-tweets_num=df['tweetId'].count()
+def topic_options():
+    topics=list(cube.topics)
+    topics.insert(0,'All Topics')
+    return [{'label': topic.capitalize(), 'value': topic} for topic in topics]
 
 '''
-creating an indicator figure and adding it to dash graph component to show total no. tweets
+getting the url of the word cloud image of a topic , waiting for the image to be made if it isn't in the project folder
+( without wait the url of an image still being made is returned , the /images route waits for it instead ) ,
+the images of the project folder are of the tweets loaded when the app started , after new tweets are read the images
+are made again for the version of the word clouds renderer
 '''
+word_cloud_versions={}
 
-tweets_num_fig = go.Figure()
-
-indicator_size=27
-tweets_num_fig.add_trace(go.Indicator(
-    mode = "number",
-    value = tweets_num,
-    number={'font':{'color':'#1dabdd','size':indicator_size},'valueformat':","},
-   domain={'row':0,'column':0}
-))
+def word_cloud_url(selected_topic,wait=True):
+    name='{}.png'.format(selected_topic)
 
-tweets_num_fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+    if name not in image_store or word_cloud_versions.get(name,dataset_version)!=word_clouds.renderer.version:
+        version=word_clouds.renderer.version
+        future=word_clouds.renderer.submit(selected_topic,cube.term_counts(selected_topic))
+        if not wait and not future.done():
+            return image_store.pending_url(name,version)
+        image_store.add_file(future.result(),name)
+        word_cloud_versions[name]=version
 
-                  )
-
-tweets_num_indicator=html.Div(dcc.Graph(figure=tweets_num_fig,config={'displayModeBar': False},id='tweets_num_indicator',style=dict(width='100%')),className='num'
-                           , style=dict(width='100%')  )
+    return image_store.url(name)
 
+def word_cloud_urls(topics):
+    return {topic: word_cloud_url(topic,wait=False) for topic in topics}
 
 '''
-creating the header of average no. retweets box
+adding the word cloud image of a topic when the browser asks for one that wasn't made yet or is of an older version
+( other names are not found or kept as they are )
 '''
+def load_word_cloud(name):
+    topics=[option['value'] for option in topic_options()]
+    if name.endswith('.png') and name[:-len('.png')] in topics:
+        word_cloud_url(name[:-len('.png')])
 
-retweets_avg_text= html.Div(html.H1('Average Number of Retweets',className= 'info-header',id='retweets_avg_text',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+image_store.missing=load_word_cloud
 
-'''
-getting average no. retweets from the dataframe
-'''
-retweets_avg=round(df['tweet_retweet_count'].mean() , 1)
 
-'''
-creating an indicator figure and adding it to dash graph component to show average no. retweets
-'''
-
-retweets_avg_fig = go.Figure()
+def search_menu(menu_id,placeholder,options):
+    return dcc.Dropdown(className="custom-dropdown",id=menu_id,options=options,placeholder=placeholder,
+                        style=dict(color='#1dabdd', fontWeight='bold', textAlign='center',
+                                   width='20vh', border='1px solid black'))
 
-retweets_avg_fig.add_trace(go.Indicator(
-    mode = "number",
-    value = retweets_avg,
-    number={'font':{'color':'#1dabdd','size':indicator_size},'suffix':"%"},
-   domain={'row':0,'column':0}
-))
 
-retweets_avg_fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+'''
+##### creating the layout of the dashboard
 
-                  )
+the components and figures are made from the loaded data the first time the /Dashboard page is opened ,
+then the same layout is given to every page load until new tweets are read ( a new data_version )
+'''
+@functools.lru_cache(maxsize=1)
+def create_main_layout(data_version):
 
-retweets_avg_indicator=html.Div(dcc.Graph(figure=retweets_avg_fig,config={'displayModeBar': False},id='retweets_avg_indicator',style=dict(width='100%')),className='num'
-                           , style=dict(width='100%')  )
+    '''
+    creating image component of our app logo
+    '''
+    logo_img=html.Div( html.Img(src=image_store.url(os.path.basename(logo_file)), id='logo_img',className='mylogo'
 
-'''
-creating the header of average no. likes box
-'''
-likes_avg_text= html.Div(html.H1('Average Number of Likes',className= 'info-header',id='likes_avg_text',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+                      )
+                       ,style=dict(paddingTop='2vh',paddingLeft='2vw',paddingBottom='0.5vh'))
 
-'''
-getting average no. likes from the dataframe
-'''
+    '''
+    styling the width of app logo image in different screen sizes
+    '''
+    db_logo_img=dbc.Col([ logo_img] ,
+            xs=dict(size=3,offset=0), sm=dict(size=3,offset=0),
+            md=dict(size=2,offset=0), lg=dict(size=2,offset=0), xl=dict(size=2,offset=0))
 
-likes_avg=int(df['tweet_like_count'].mean() )
+    '''
+    creating the header of number of tweets box
+    '''
+    tweets_num_text= html.Div(html.H1('Total Number of Tweets',className= 'info-header',id='tweets_num_text',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict( textAlign="center", width='100%'))
 
-'''
-creating an indicator figure and adding it to dash graph component to show average no. likes
-'''
-likes_avg_fig = go.Figure()
+    '''
+    getting total no. tweets from the tweets counts
+    '''
+    tweets_num=cube.tweets_number()
 
-likes_avg_fig.add_trace(go.Indicator(
-    mode = "number",
-    value = likes_avg,
-    number={'font':{'color':'#1dabdd','size':indicator_size},'suffix':"%"},
-   domain={'row':0,'column':0}
-))
+    '''
+    creating an indicator figure and adding it to dash graph component to show total no. tweets
+    '''
 
-likes_avg_fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+    tweets_num_fig = charts.create_indicator(tweets_num,valueformat=",")
 
-                  )
+    tweets_num_indicator=html.Div(dcc.Graph(figure=tweets_num_fig,config={'displayModeBar': False},id='tweets_num_indicator',style=dict(width='100%')),className='num'
+                               , style=dict(width='100%')  )
 
-likes_avg_indicator=html.Div(dcc.Graph(figure=likes_avg_fig,config={'displayModeBar': False},id='likes_avg_indicator',style=dict(width='100%')),className='num'
-                           , style=dict(width='100%')  )
 
-'''
-creating the header of average no. replies box
-'''
-replies_avg_text= html.Div(html.H1('Average Number of Replies',className= 'info-header',id='replies_avg_text',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+    '''
+    creating the header of average no. retweets box
+    '''
 
-'''
-getting average no. replies from the dataframe
-'''
-replies_avg=int(df['tweet_reply_count'].mean() )
+    retweets_avg_text= html.Div(html.H1('Average Number of Retweets',className= 'info-header',id='retweets_avg_text',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
 
-'''
-creating an indicator figure and adding it to dash graph component to show average no. replies
-'''
-replies_avg_fig = go.Figure()
+    '''
+    getting average no. retweets from the tweets counts
+    '''
+    retweets_avg=round(cube.average('tweet_retweet_count') , 1)
 
-replies_avg_fig.add_trace(go.Indicator(
-    mode = "number",
-    value = replies_avg,
-    number={'font':{'color':'#1dabdd','size':indicator_size},'suffix':"%"},
-   domain={'row':0,'column':0}
-))
+    '''
+    creating an indicator figure and adding it to dash graph component to show average no. retweets
+    '''
 
-replies_avg_fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+    retweets_avg_fig = charts.create_indicator(retweets_avg,suffix="%")
 
-                  )
+    retweets_avg_indicator=html.Div(dcc.Graph(figure=retweets_avg_fig,config={'displayModeBar': False},id='retweets_avg_indicator',style=dict(width='100%')),className='num'
+                               , style=dict(width='100%')  )
 
-replies_avg_indicator=html.Div(dcc.Graph(figure=replies_avg_fig,config={'displayModeBar': False},id='replies_avg_indicator',style=dict(width='100%')),className='num'
-                           , style=dict(width='100%')  )
+    '''
+    creating the header of average no. likes box
+    '''
+    likes_avg_text= html.Div(html.H1('Average Number of Likes',className= 'info-header',id='likes_avg_text',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
 
+    '''
+    getting average no. likes from the tweets counts
+    '''
 
-'''
-creating the header of total no. countries box
-'''
-countries_num_text= html.Div(html.H1('Total Number of Countries',className= 'info-header',id='countries_num_text',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+    likes_avg=int(cube.average('tweet_like_count') )
 
+    '''
+    creating an indicator figure and adding it to dash graph component to show average no. likes
+    '''
+    likes_avg_fig = charts.create_indicator(likes_avg,suffix="%")
 
-'''
-getting total no. countries from the dataframe
-'''
-countries_num=int(df['country'].nunique() )
+    likes_avg_indicator=html.Div(dcc.Graph(figure=likes_avg_fig,config={'displayModeBar': False},id='likes_avg_indicator',style=dict(width='100%')),className='num'
+                               , style=dict(width='100%')  )
 
-'''
-creating an indicator figure and adding it to dash graph component to show total no. countries
-'''
-countries_num_fig = go.Figure()
+    '''
+    creating the header of average no. replies box
+    '''
+    replies_avg_text= html.Div(html.H1('Average Number of Replies',className= 'info-header',id='replies_avg_text',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+
+    '''
+    getting average no. replies from the tweets counts
+    '''
+    replies_avg=int(cube.average('tweet_reply_count') )
+
+    '''
+    creating an indicator figure and adding it to dash graph component to show average no. replies
+    '''
+    replies_avg_fig = charts.create_indicator(replies_avg,suffix="%")
+
+    replies_avg_indicator=html.Div(dcc.Graph(figure=replies_avg_fig,config={'displayModeBar': False},id='replies_avg_indicator',style=dict(width='100%')),className='num'
+                               , style=dict(width='100%')  )
+
+
+    '''
+    creating the header of total no. countries box
+    '''
+    countries_num_text= html.Div(html.H1('Total Number of Countries',className= 'info-header',id='countries_num_text',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+
+
+    '''
+    getting total no. countries from the tweets counts
+    '''
+    countries_num=cube.countries_number()
+
+    '''
+    creating an indicator figure and adding it to dash graph component to show total no. countries
+    '''
+    countries_num_fig = charts.create_indicator(countries_num,valueformat=",")
+
+    countries_num_indicator=html.Div(dcc.Graph(figure=countries_num_fig,config={'displayModeBar': False},id='countries_num_indicator',style=dict(width='100%')),className='num'
+                               , style=dict(width='100%')  )
+
+    '''
+    the topics of the menus ( All Topics first )
+    '''
+    topics=[option['value'] for option in topic_options()]
+
+    '''
+    creating dash dropdown menu to select topic from it 
+    '''
+    topics_menu = dcc.Dropdown(className="custom-dropdown",
+                                id='topics_menu',
+
+                                options=topic_options()
+                                ,
+                                value='All Topics',
+                                style=dict(color='#1dabdd', fontWeight='bold', textAlign='center',
+                                           width='16vh', backgroundColor='#1dabdd', border='1px solid black')
+                                )
+
+    topics_text = html.Div(html.H1('Topics',
+                                    style=dict(fontSize='1.5vh', fontWeight='bold', color='black' )))
+
+    topics_menu_div = html.Div([topics_menu],
+                                style=dict(fontSize='1.7vh',paddingTop='1vh',textAlign='center',display= 'flex',
+                                           alignItems= 'center', justifyContent= 'center',width='100%'
+                                           ))
+
+    topics_div=html.Div([topics_menu_div],style={'width': '100%', 'display': 'flex', 'align-items': 'center',
+                                                               'justify-content': 'center'})
+
+    '''
+    ##### Number of Tweets Over Days by Topic
+
+
+    creating header of the line chart graph
+    '''
+    date_chart_header= html.Div(html.H1('Number of Tweets Over Days by Topic',className= 'date-chart-header',id='date_chart_header',
+                                        style=dict( fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+
+    '''
+    creating the line chart graph component ( filled with empty figure in beginning to be updated from the callback
+    when app starts depending on topics dropdown menu value )
+    '''
+    date_chart=go.Figure(go.Scatter())
+    date_chart_div=html.Div([
+                dcc.Graph(id='date_chart', config={'displayModeBar': True,'displaylogo': False,'modeBarButtonsToRemove': ['lasso2d','pan']},className='date-fig',
+                    style=dict(backgroundColor='#f7f7f7') ,figure=date_chart
+                ) ] ,id='date_chart_div'
+            )
+
+    '''
+    ##### Trending Terms
+
+
+    creating header of the trending terms bar chart graph
+    '''
+    trending_chart_header= html.Div(html.H1('Trending Terms',className= 'date-chart-header',id='trending_chart_header',
+                                        style=dict( fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+
+    '''
+    creating the trending terms bar chart graph component ( filled with empty figure in beginning to be updated
+    from the callback when app starts depending on topics dropdown menu value and the line chart dates range )
+    '''
+    trending_chart_div=html.Div([
+                dcc.Graph(id='trending_chart', config={'displayModeBar': False},className='hor-bar-fig',
+                    style=dict(backgroundColor='#f7f7f7') ,figure=go.Figure(go.Bar())
+                ) ] ,id='trending_chart_div'
+            )
+
+    '''
+    ##### Sentiment Score by Topic
+
+
+    creating header of the horizontal bar chart graph
+    '''
+    hor_bar_chart_header= html.Div(html.H1('Sentiment Score by Topic',className= 'date-chart-header',id='hor_bar_chart_header',
+                                        style=dict(fontWeight='bold', color='black',
+                                                   marginTop='')),
+                                style=dict(textAlign="center", width='100%'))
+
+    '''
+    creating the horizontal bar chart graph component where we got the figure from charts.py function
+    '''
+    with instrumentation.phase('layout_figures'):
+        hor_bar_chart=charts.create_hor_bar(cube)
+    hor_bar_chart_div=html.Div([
+                dcc.Graph(id='hor_bar_chart', config={'displayModeBar': True,'displaylogo': False,
+                                              'modeBarButtonsToRemove': ['lasso2d','pan','zoom2d','zoomIn2d','zoomOut2d','autoScale2d']}
+                          ,className='hor-bar-fig',
+                    style=dict(height='',backgroundColor='#f7f7f7',border='') ,figure=hor_bar_chart
+                ) ] ,id='hor_bar_chart_div'
+            )
+
+    '''
+    ##### Top 5 Cities With Tweets
+
+
+    creating header of the vertical bar chart graph 
+    '''
+    ver_bar_chart_header= html.Div(html.H1('Top 5 Cities With Tweets',className= 'date-chart-header',id='ver_bar_chart_header',
+                                        style=dict( fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+
+    '''
+    creating a countries/cities radio button to choose from for the vertical bar chart
+    '''
+    location_filter = html.Div(
+        [
+            dbc.RadioItems( options=[ {"label": "Countries", "value": 'country'},
+                                      {"label": "Cities", "value": 'city'},],
+                value='city',
+                id="location_filter",
+                inline=True, label_class_name='filter-label',input_class_name='filter-button',input_checked_class_name='filter-button-checked' ,
+                input_checked_style=dict(backgroundColor='#1dabdd',border='2px solid #1dabdd')
+            ),
+        ]
+    )
 
-countries_num_fig.add_trace(go.Indicator(
-    mode = "number",
-    value = countries_num,
-    number={'font':{'color':'#1dabdd','size':indicator_size},'valueformat':","},
-   domain={'row':0,'column':0}
-))
+    '''
+    creating the vertical bar chart graph component where we got the figure from charts.py function
+    ( filled with empty figure in beginning to be updated from the callback
+    when app starts depending on countries/cities radio buttons selected )
+    '''
+    ver_bar_chart=go.Figure(go.Bar())
+    ver_bar_chart_div=html.Div([
+                dcc.Graph(id='ver_bar_chart', config={'displayModeBar': True,'displaylogo': False,
+                                              'modeBarButtonsToRemove': ['lasso2d','pan','zoom2d','zoomIn2d','zoomOut2d','autoScale2d']}
+                          ,className='ver-bar-fig',
+                    style=dict(backgroundColor='#f7f7f7') ,figure=ver_bar_chart
+                ) ] ,id='ver_bar_chart_div'
+            )
+
+    '''
+    ##### wordcloud part
+
+    topics that have an image in the project folder ( made before with the wordcloud library ) use it directly ,
+    images of other topics are made from the words counts of the topic in the background ( using word_clouds.py file )
+    '''
+
+    '''
+    image header
+    '''
+    word_cloud_header= html.Div(html.H1('Word Cloud by Topic',className= 'word-cloud-header',id='word_cloud_header',
+                                        style=dict(fontWeight='bold', color='black',
+                                                   )),
+                                style=dict(textAlign="center"))
+
+    '''
+    adding image to dash html image component
+    '''
+    word_cloud=html.Div( html.Img(src=image_store.url('All Topics.png'), id='word_cloud',className='word-cloud'
+
+                      )
+                        )
+
+    '''
+    making another topic menu same as before but this time will be used with wordcloud
+    '''
+    topics_menu2 = dcc.Dropdown(className="custom-dropdown",
+                                id='topics_menu2',
+
+                                options=topic_options()
+                                ,
+                                value='All Topics',
+                                style=dict(color='#1dabdd', fontWeight='bold', textAlign='center',
+                                           width='16vh', backgroundColor='#1dabdd', border='1px solid black')
+                                )
+
+
+    topics_menu_div2 = html.Div([topics_menu2],
+                                style=dict(fontSize='1.7vh',paddingTop='0.5vh',textAlign='center',display= 'flex',
+                                           alignItems= 'center', justifyContent= 'center',width='100%'
+                                           ))
+
+
+    '''
+    ##### Number of Tweets by Country Map
+
+
+    creating header of the map
+    '''
+
+
+    map_header= html.Div(html.H1('Number of Tweets by Country',className= 'date-chart-header',id='map_header',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
+    '''
+    creating a countries/cities radio button for the map ( only shown when the dataset has city coordinates )
+    '''
+    map_location_filter = html.Div(
+        [
+            dbc.RadioItems( options=[ {"label": "Countries", "value": 'country'},
+                                      {"label": "Cities", "value": 'city'},],
+                value='country',
+                id="map_location_filter",
+                inline=True, label_class_name='filter-label',input_class_name='filter-button',input_checked_class_name='filter-button-checked' ,
+                input_checked_style=dict(backgroundColor='#1dabdd',border='2px solid #1dabdd')
+            ),
+        ],style=dict(display='block' if cube.city_points is not None else 'none')
+    )
 
-countries_num_fig.update_layout(paper_bgcolor = "#f7f7f7",plot_bgcolor='white',height=50,margin=dict(l=0, r=0, t=0, b=0),
+    '''
+    creating the map component where we got the figure from charts.py function
+    '''
+    with instrumentation.phase('layout_figures'):
+        map_fig=charts.create_countries_map(cube)
+    map_div=html.Div([
+                dcc.Graph(id='map_fig', config={'displayModeBar': True,'displaylogo': False,
+                                              'modeBarButtonsToRemove': ['lasso2d','pan']}
+                          ,className='map-fig',
+                    style=dict(height='',backgroundColor='#f7f7f7',border='') ,figure=map_fig
+                ) ] ,id='map_div'
+            )
 
-                  )
 
-countries_num_indicator=html.Div(dcc.Graph(figure=countries_num_fig,config={'displayModeBar': False},id='countries_num_indicator',style=dict(width='100%')),className='num'
-                           , style=dict(width='100%')  )
+    '''
+    ##### Tweets Reliability Levels Donut Chart
+    '''
 
-'''
-gettng a unique list of topics from dataframe
-'''
-topics=list(df['topic'].unique())
+    donut_header= html.Div(html.H1('Tweets Reliability Levels',className= 'date-chart-header',id='donut_header',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
 
-'''
-inserting All Topics value in the list
-'''
-topics.insert(0,'All Topics')
+    '''
+    creating the donut component 
+    '''
+    with instrumentation.phase('layout_figures'):
+        donut = charts.create_donut(cube)
 
-'''
-creating dash dropdown menu to select topic from it 
-'''
-topics_menu = dcc.Dropdown(className="custom-dropdown",
-                            id='topics_menu',
 
-                            options=[{'label': topic.capitalize(), 'value': topic} for topic in topics]
-                            ,
-                            value='All Topics',
-                            style=dict(color='#1dabdd', fontWeight='bold', textAlign='center',
-                                       width='16vh', backgroundColor='#1dabdd', border='1px solid black')
-                            )
+    donut_div=html.Div([
+                dcc.Graph(id='donut_fig', config={'displayModeBar': False,'displaylogo': False,
+                                              'modeBarButtonsToRemove': ['lasso2d','pan']}
+                          ,className='donut-fig',
+                    style=dict(backgroundColor='#f7f7f7') ,figure=donut
+                ) ] ,id='donut_div'
+            )
 
-topics_text = html.Div(html.H1('Topics',
-                                style=dict(fontSize='1.5vh', fontWeight='bold', color='black' )))
 
-topics_menu_div = html.Div([topics_menu],
-                            style=dict(fontSize='1.7vh',paddingTop='1vh',textAlign='center',display= 'flex',
-                                       alignItems= 'center', justifyContent= 'center',width='100%'
-                                       ))
 
-topics_div=html.Div([topics_menu_div],style={'width': '100%', 'display': 'flex', 'align-items': 'center',
-                                                           'justify-content': 'center'})
 
-'''
-##### Number of Tweets Over Days by Topic
+    '''
+    ##### Tweets search
 
 
-creating header of the line chart graph
-'''
-date_chart_header= html.Div(html.H1('Number of Tweets Over Days by Topic',className= 'date-chart-header',id='date_chart_header',
-                                    style=dict( fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+    creating header of the search , the query input , the filters menus and the results table
+    ( the results are read from the search index one page at a time )
+    '''
+    search_header= html.Div(html.H1('Search Tweets',className= 'date-chart-header',id='search_header',
+                                        style=dict(fontWeight='bold', color='black')),
+                                style=dict(textAlign="center", width='100%'))
 
-'''
-creating the line chart graph component ( filled with empty figure in beginning to be updated from the callback
-when app starts depending on topics dropdown menu value )
-'''
-date_chart=go.Figure(go.Scatter())
-date_chart_div=html.Div([
-            dcc.Graph(id='date_chart', config={'displayModeBar': True,'displaylogo': False,'modeBarButtonsToRemove': ['lasso2d','pan']},className='date-fig',
-                style=dict(backgroundColor='#f7f7f7') ,figure=date_chart
-            ) ] ,id='date_chart_div'
-        )
+    search_input=dcc.Input(id='search_query',type='text',debounce=True,placeholder='runway pilot OR airl*',
+                           style=dict(width='30vw',border='1px solid black',paddingLeft='0.5vw'))
 
-'''
-##### Sentiment Score by Topic
 
+    search_filters=html.Div([search_input,
+                             search_menu('search_topic','Topic',[{'label': topic.capitalize(), 'value': topic} for topic in cube.topics]),
+                             search_menu('search_sentiment','Sentiment',[{'label': name, 'value': code} for code,name in charts.sent_dict.items()]),
+                             search_menu('search_country','Country',[{'label': country, 'value': country} for country in sorted(cube.countries.index)])],
+                            style=dict(display='flex',alignItems='center',justifyContent='center',gap='1vw',
+                                       fontSize='1.7vh',paddingTop='1vh',paddingBottom='1vh',width='100%'))
 
-creating header of the horizontal bar chart graph
-'''
-hor_bar_chart_header= html.Div(html.H1('Sentiment Score by Topic',className= 'date-chart-header',id='hor_bar_chart_header',
-                                    style=dict(fontWeight='bold', color='black',
-                                               marginTop='')),
-                            style=dict(textAlign="center", width='100%'))
+    search_count=html.Div(id='search_count',style=dict(textAlign='center',fontWeight='bold',color='black',fontSize='1.7vh'))
 
-'''
-creating the horizontal bar chart graph component where we got the figure from charts.py function
-'''
-hor_bar_chart=charts.create_hor_bar(df)
-hor_bar_chart_div=html.Div([
-            dcc.Graph(id='hor_bar_chart', config={'displayModeBar': True,'displaylogo': False,
-                                          'modeBarButtonsToRemove': ['lasso2d','pan','zoom2d','zoomIn2d','zoomOut2d','autoScale2d']}
-                      ,className='hor-bar-fig',
-                style=dict(height='',backgroundColor='#f7f7f7',border='') ,figure=hor_bar_chart
-            ) ] ,id='hor_bar_chart_div'
-        )
+    search_table=dash_table.DataTable(id='search_results',
+                                      columns=[{'name': column.capitalize(), 'id': column} for column in search.result_columns],
+                                      data=[],page_action='custom',page_current=0,page_size=search.PAGE_SIZE,page_count=0,
+                                      style_cell=dict(textAlign='left',fontFamily='Arial',fontSize='1.5vh',whiteSpace='normal',
+                                                      backgroundColor='#f7f7f7'),
+                                      style_header=dict(fontWeight='bold',color='white',backgroundColor='#1dabdd'))
 
-'''
-##### Top 5 Cities With Tweets
+    search_col=dbc.Col([dbc.Card(dbc.CardBody([search_header,search_filters,search_count,search_table])
+                                          , style=dict(backgroundColor='#f7f7f7'), id='card13',
+                                          className='charts-card'), html.Br()
+                                 ], xl=dict(size=9, offset=0), lg=dict(size=8, offset=0),
+                                md=dict(size=8, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')) if search_index is not None else html.Div()
+
+    '''
+    adding all of the app components in app.layout object 
+    the design made using dash-bootstrap columns , rows and cards
+    '''
+    main_layout=html.Div([dcc.Store(id='cross_filter',data=no_filters),dcc.Interval(id='refresh_interval',interval=live_ingest.REFRESH_SECONDS*1000,
+                                       disabled=live_ingest.REFRESH_SECONDS==0),
+                          dcc.Store(id='data_version',data=data_version),
+                          dcc.Store(id='viewport'),
+                          dcc.Store(id='view_data',data=clientside.view_data(cube,topics,word_cloud_urls(topics))
+                                    if clientside.CLIENTSIDE_MODE else None),
+                          dbc.Row([db_logo_img,db_header_text],
+                                  style=dict(backgroundColor='white'),id='main_header' ),
+                          html.Div([html.Span(id='cross_filter_text',style=dict(fontWeight='bold',color='black')),
+                                    html.Button('Clear',id='clear_cross_filter',n_clicks=0,className='clear-filter-button',
+                                                style=dict(marginLeft='1vw',color='white',backgroundColor='#1dabdd',
+                                                           border='none',fontWeight='bold'))],
+                                   id='cross_filter_div',style=dict(display='none')),
+                          #html.Br(),
+
+                        dbc.Row([
+                            html.Div([
+
+                          dbc.Card(dbc.CardBody([tweets_num_text,
+                                                          dbc.Spinner([tweets_num_indicator], size="lg", color="primary",
+                                                                      type="border", fullscreen=False,
+                                                                      spinner_style=dict(marginTop=''))
 
+                                                          ])
+                                            , style=dict(backgroundColor='#f7f7f7'), id='card3',
+                                            className='info-card'),
 
-creating header of the vertical bar chart graph 
-'''
-ver_bar_chart_header= html.Div(html.H1('Top 5 Cities With Tweets',className= 'date-chart-header',id='ver_bar_chart_header',
-                                    style=dict( fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
 
-'''
-creating a countries/cities radio button to choose from for the vertical bar chart
-'''
-location_filter = html.Div(
-    [
-        dbc.RadioItems( options=[ {"label": "Countries", "value": 'country'},
-                                  {"label": "Cities", "value": 'city'},],
-            value='city',
-            id="location_filter",
-            inline=True, label_class_name='filter-label',input_class_name='filter-button',input_checked_class_name='filter-button-checked' ,
-            input_checked_style=dict(backgroundColor='#1dabdd',border='2px solid #1dabdd')
-        ),
-    ]
-)
+                          dbc.Card(dbc.CardBody([retweets_avg_text,
+                                                          dbc.Spinner([retweets_avg_indicator], size="lg", color="primary",
+                                                                      type="border", fullscreen=False,
+                                                                      spinner_style=dict(marginTop=''))
 
-'''
-creating the vertical bar chart graph component where we got the figure from charts.py function
-( filled with empty figure in beginning to be updated from the callback
-when app starts depending on countries/cities radio buttons selected )
-'''
-ver_bar_chart=go.Figure(go.Bar())
-ver_bar_chart_div=html.Div([
-            dcc.Graph(id='ver_bar_chart', config={'displayModeBar': True,'displaylogo': False,
-                                          'modeBarButtonsToRemove': ['lasso2d','pan','zoom2d','zoomIn2d','zoomOut2d','autoScale2d']}
-                      ,className='ver-bar-fig',
-                style=dict(backgroundColor='#f7f7f7') ,figure=ver_bar_chart
-            ) ] ,id='ver_bar_chart_div'
-        )
+                                                          ])
+                                            , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card4',
+                                            className='info-card'),
+
+                            dbc.Card(dbc.CardBody([likes_avg_text,
+                                                            dbc.Spinner([likes_avg_indicator], size="lg",
+                                                                        color="primary",
+                                                                        type="border", fullscreen=False,
+                                                                        spinner_style=dict(marginTop=''))
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card4',
+                                              className='info-card'),
+
+                            dbc.Card(dbc.CardBody([replies_avg_text,
+                                                            dbc.Spinner([replies_avg_indicator], size="lg",
+                                                                        color="primary",
+                                                                        type="border", fullscreen=False,
+                                                                        spinner_style=dict(marginTop=''))
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card5',
+                                              className='info-card'),
+
+                           dbc.Card(dbc.CardBody([countries_num_text,
+                                                            dbc.Spinner([countries_num_indicator], size="lg",
+                                                                        color="primary",
+                                                                        type="border", fullscreen=False,
+                                                                        spinner_style=dict(marginTop=''))
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card6',
+                                              className='info-card'),
+                                               ],style=dict(display= 'flex', alignItems= 'center',
+                                                            justifyContent= 'center',width='100%'))
+                                                ]),
+                            html.Br(),
+
+                          dbc.Row([
+                            dbc.Col([dbc.Card(dbc.CardBody([date_chart_header,
+                                                            dbc.Spinner([date_chart_div], size="lg", color="primary", type="border",
+                                                                        fullscreen=False) , topics_div
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7'), id='card7',
+                                              className='charts-card'), html.Br()
+                                     ], xl=dict(size=5, offset=0), lg=dict(size=6, offset=0),
+                                    md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                    style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                            dbc.Col([dbc.Card(dbc.CardBody([trending_chart_header,
+                                                            dbc.Spinner([trending_chart_div], size="lg", color="primary",
+                                                                        type="border",
+                                                                        fullscreen=False),
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7'), id='card14',
+                                              className='charts-card'), html.Br()
+                                     ], xl=dict(size=3, offset=0), lg=dict(size=6, offset=0),
+                                    md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                    style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                            dbc.Col([dbc.Card(dbc.CardBody([hor_bar_chart_header,
+                                                            dbc.Spinner([hor_bar_chart_div], size="lg", color="primary",
+                                                                        type="border",
+                                                                        fullscreen=False),
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7'), id='card8',
+                                              className='charts-card'), html.Br()
+                                     ], xl=dict(size=4, offset=0), lg=dict(size=6, offset=0),
+                                    md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                    style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                            dbc.Col([dbc.Card(dbc.CardBody([ver_bar_chart_header,
+                                                            dbc.Spinner([ver_bar_chart_div], size="lg", color="primary",
+                                                                        type="border",
+                                                                        fullscreen=False),location_filter
+
+                                                            ])
+                                              , style=dict(backgroundColor='#f7f7f7'), id='card9',
+                                              className='charts-card'), html.Br()
+                                     ], xl=dict(size=3, offset=0), lg=dict(size=4, offset=0),
+                                    md=dict(size=4, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                    style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                              dbc.Col([dbc.Card(dbc.CardBody([map_header,
+                                                              dbc.Spinner([map_div], size="lg", color="primary",
+                                                                          type="border",
+                                                                          fullscreen=False),map_location_filter
+
+                                                              ])
+                                                , style=dict(backgroundColor='#f7f7f7'), id='card10',
+                                                className='map-card'), html.Br()
+                                       ], xl=dict(size=5, offset=0), lg=dict(size=6, offset=0),
+                                      md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                      style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                              dbc.Col([dbc.Card(dbc.CardBody([word_cloud_header,
+                                                              dbc.Spinner([word_cloud], size="lg", color="primary",
+                                                                          type="border",
+                                                                          fullscreen=False),topics_menu_div2
+
+                                                              ])
+                                                , style=dict(backgroundColor='#f7f7f7'), id='card11',
+                                                className='map-card'), html.Br()
+                                       ], xl=dict(size=4, offset=0), lg=dict(size=6, offset=0),
+                                      md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                      style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+
+                              dbc.Col([dbc.Card(dbc.CardBody([donut_header,
+                                                              dbc.Spinner([donut_div], size="lg", color="primary",
+                                                                          type="border",
+                                                                          fullscreen=False)
+
+                                                              ])
+                                                , style=dict(backgroundColor='#f7f7f7'), id='card12',
+                                                className='map-card'), html.Br()
+                                       ], xl=dict(size=3, offset=0), lg=dict(size=4, offset=0),
+                                      md=dict(size=4, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
+                                      style=dict(paddingLeft='0.5vw', paddingRight='0.5vw')),
+
+                              search_col
+
+                            ],className='g-0')
+                          ]
+
+                         )
+    return main_layout
 
-'''
-##### wordcloud part
 
-wordcloud images was originally created from this code :
 
-    for ind in graph_data.index:
-        text += graph_data['text'][ind]
 
-    wordcloud = WordCloud(max_font_size=60, max_words=100, background_color="#f7f7f7",
-  collocations=False,
-                      random_state = 42,relative_scaling = 0.3,
-                      colormap = 'turbo',
-                      repeat = False,
-                      normalize_plurals = True).generate(text)
-    plt.figure(facecolor='#f7f7f7')
-    plt.imshow(wordcloud, interpolation="bilinear")
-    plt.axis("off")
-    plt.tight_layout(pad=0)
-    plt.savefig(wordcloud_dir, facecolor='#f7f7f7', bbox_inches='tight')
-    
-we used images saved from this code to directly read them into the app for better performance
-'''
 
-'''
-getting word cloud image directory
-'''
-wordcloud_dir=os.path.join(THIS_FOLDER, 'All Topics.png')
+app.layout = html.Div([dbc.Spinner([html.Div(id='layout')],size="lg", color="primary", type="border", fullscreen=True,id='spinner')
+,dcc.Location(id='url', refresh=True,pathname='/Dashboard')
+                       ], style=dict(backgroundColor='white'), className='main',
+                      id='main_div')
 
 '''
-encoding wordcloud image
+setting the landing page url extension to /Dashboard and loading app.layout there
+( the layout is made the first time the page is opened for each version of the data , see create_main_layout )
 '''
-encoded = base64.b64encode(open(wordcloud_dir, 'rb').read())
+@app.callback([Output('layout','children'),Output('spinner','delay_show')],Input('url','pathname'))
+def landing_page(pathname):
+    if pathname=='/Dashboard':
+        load_data()
+        return (create_main_layout(figure_cache.cache.version),60000 )
+    else:
+        return (dash.no_update ,dash.no_update)
 
-'''
-image header
-'''
-word_cloud_header= html.Div(html.H1('Word Cloud by Topic',className= 'word-cloud-header',id='word_cloud_header',
-                                    style=dict(fontWeight='bold', color='black',
-                                               )),
-                            style=dict(textAlign="center"))
 
 '''
-adding image to dash html image component
+updating the line chart depending on topic selected and the dates range the user zoomed to
+( the points are hourly , daily or weekly depending on the length of the range )
 '''
-word_cloud=html.Div( html.Img(src='data:image/jpg;base64,{}'.format(encoded.decode()), id='word_cloud',className='word-cloud'
-
-                  )
-                    )
+@figure_cache.memoize('date_chart')
+def date_chart_figure(selected_topic,start,end,max_points,filters,data_version):
+    return charts.create_date_chart(filtered_cube(filters,data_version,exclude='topic'),selected_topic,start,end,max_points)
 
 '''
-making another topic menu same as before but this time will be used with wordcloud
+getting the dates range the user zoomed to from the line chart relayout data
+( None , None for the whole history and False when the relayout didn't change the range )
 '''
-topics_menu2 = dcc.Dropdown(className="custom-dropdown",
-                            id='topics_menu2',
+def selected_dates_range(relayout_data):
+    if not relayout_data:
+        return None,None
+    if relayout_data.get('xaxis.autorange'):
+        return None,None
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'],relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return False
 
-                            options=[{'label': topic.capitalize(), 'value': topic} for topic in topics]
-                            ,
-                            value='All Topics',
-                            style=dict(color='#1dabdd', fontWeight='bold', textAlign='center',
-                                       width='16vh', backgroundColor='#1dabdd', border='1px solid black')
-                            )
+def update_date_chart(selected_topic,relayout_data=None,viewport_width=None,filters=None,data_version=None):
+    dates_range=selected_dates_range(relayout_data)
 
+    if dates_range is False:
+        # legend clicks and other changes that don't change the dates range
+        if dash.callback_context.triggered_id=='date_chart':
+            raise PreventUpdate
+        dates_range=(None,None)
 
-topics_menu_div2 = html.Div([topics_menu2],
-                            style=dict(fontSize='1.7vh',paddingTop='0.5vh',textAlign='center',display= 'flex',
-                                       alignItems= 'center', justifyContent= 'center',width='100%'
-                                       ))
+    if dash.callback_context.triggered_id=='topics_menu':
+        precompute.scheduler.record_request(selected_topic)
 
+    # each line has about one point every 2 pixels of the browser width ( rounded up to a few sizes ) ,
+    # zooming in gets the points of the smaller range
+    max_points=downsampling.points_budget(viewport_width)
+    return date_chart_figure(selected_topic,dates_range[0],dates_range[1],max_points,filters,data_version)
 
 '''
-##### Number of Tweets by Country Map
-
-
-creating header of the map
+updating the trending terms depending on topic selected , the recent days end at the end of the dates range the user
+zoomed to on the line chart ( the last day with tweets otherwise ) , the words counts are kept by day in aggregates.py
+so new tweets only add their counts
 '''
+@figure_cache.memoize('trending_chart')
+def trending_chart_figure(selected_topic,end,data_version):
+    return charts.create_trending_bar(trending.trending_terms(cube,selected_topic,end))
 
+def update_trending_chart(selected_topic,relayout_data=None,data_version=None):
+    dates_range=selected_dates_range(relayout_data)
 
-map_header= html.Div(html.H1('Number of Tweets by Country',className= 'date-chart-header',id='map_header',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
-'''
-creating the map component where we got the figure from charts.py function
-'''
-map_fig=charts.create_countries_map(df)
-map_div=html.Div([
-            dcc.Graph(id='map_fig', config={'displayModeBar': True,'displaylogo': False,
-                                          'modeBarButtonsToRemove': ['lasso2d','pan']}
-                      ,className='map-fig',
-                style=dict(height='',backgroundColor='#f7f7f7',border='') ,figure=map_fig
-            ) ] ,id='map_div'
-        )
+    if dates_range is False:
+        if dash.callback_context.triggered_id=='date_chart':
+            raise PreventUpdate
+        dates_range=(None,None)
+
+    return trending_chart_figure(selected_topic,dates_range[1],data_version)
 
+app.callback(Output('trending_chart','figure'),
+             [Input('topics_menu','value'),Input('date_chart','relayoutData'),
+              Input('data_version','data')])(update_trending_chart)
 
 '''
-creating a dataframe that will be used in donut chart to get percentages of reliability categories
+getting the browser width when the dashboard is shown , used to choose the number of points of the line chart
 '''
-
-dff=df.groupby('Reliability Categories')['tweetId'].count()
-dff=dff.reset_index()
+app.clientside_callback('function(id){return window.innerWidth;}',Output('viewport','data'),Input('viewport','id'))
 
 '''
-adjusting the order of the reliability categories will be shown on donut chart
+updating the vertical bar chart depending on radio button selected
 '''
+@figure_cache.memoize('ver_bar_chart')
+def update_ver_bar_chart(selected_location,filters=None,data_version=None):
+    # checking if user choosed countries or cities and set the loc parameter that will be sent to the charts.py function according to it
+    if selected_location=='city':
+        loc='Cities'
 
-temp=dff.loc[0]
-dff.loc[0]=dff.loc[4]
-dff.loc[4]=temp
-temp=dff.loc[1]
-dff.loc[1]=dff.loc[4]
-dff.loc[4]=temp
-temp=dff.loc[2]
-dff.loc[2]=dff.loc[3]
-dff.loc[3]=temp
-temp=dff.loc[1]
-dff.loc[1]=dff.loc[2]
-dff.loc[2]=temp
+    elif selected_location=='country':
+        loc='Countries'
 
+    # the countries chart isn't filtered by the country clicked on the map
+    aggregates_view=filtered_cube(filters,data_version,exclude='country' if selected_location=='country' else None)
+    return (charts.create_ver_bar(aggregates_view,selected_location), 'Top 5 {} With Tweets'.format(loc))
 
 '''
-##### Tweets Reliability Levels Donut Chart
+new tweets were read by the tailer ( in its background thread ) , the figures are cached for a new version
 '''
-
-donut_header= html.Div(html.H1('Tweets Reliability Levels',className= 'date-chart-header',id='donut_header',
-                                    style=dict(fontWeight='bold', color='black')),
-                            style=dict(textAlign="center", width='100%'))
+def new_rows_read():
+    figure_cache.cache.version='{}+{}'.format(dataset_version,tailer.rows)
+    word_clouds.renderer.set_version(figure_cache.cache.version)
+    # the figures of the older version that aren't made yet aren't needed anymore
+    precompute.scheduler.cancel_queued()
+    warm_views(figure_cache.cache.version,precompute.REFRESH_TOPICS)
 
 '''
-creating the donut component 
+checking periodically if new tweets were read and updating the topics menus when there are new ones
+( data_version makes the indicators and charts update too )
 '''
-donut = go.Figure(data=go.Pie(labels=dff['Reliability Categories'], values=dff['tweetId'],hole=.3,showlegend=False,sort=False))
-donut.update_traces(hoverinfo='label+percent', textinfo='label+percent', textfont_size=14, textfont_family='Arial',
-                  marker=dict(colors=['#009191','#3B98F5','#46FFFF','#1500FF','#A5ECFF'], line=dict(color='#0f2937')),
-                    texttemplate = '<b>%{label}</br></br>%{percent}</b>')
-
-donut.update_layout(
-    font=dict(size=14, family='Arial', color='black')
-    ,hoverlabel=dict(font_size=14, font_family="Rockwell")
-    , plot_bgcolor='#f7f7f7',
-    paper_bgcolor='#f7f7f7', margin=dict(l=0, r=0, t=20, b=0)
-
-)
-
-
-donut_div=html.Div([
-            dcc.Graph(id='map_fig', config={'displayModeBar': False,'displaylogo': False,
-                                          'modeBarButtonsToRemove': ['lasso2d','pan']}
-                      ,className='donut-fig',
-                style=dict(backgroundColor='#f7f7f7') ,figure=donut
-            ) ] ,id='donut_div'
-        )
+@app.callback([Output('topics_menu','options'),Output('topics_menu2','options'),Output('data_version','data')],
+              Input('refresh_interval','n_intervals'),State('data_version','data'))
+def refresh_data(n_intervals,shown_version):
+    # the page already shows the latest tweets
+    if shown_version==figure_cache.cache.version:
+        raise PreventUpdate
 
+    return (topic_options(),topic_options(),figure_cache.cache.version)
 
 '''
-adding all of the app components in app.layout object 
-the design made using dash-bootstrap columns , rows and cards
+clicking a country on the map or a topic on the horizontal bar chart selects it as a filter of the other charts
+( clicking it again or the clear button removes it ) , the selected topic is also chosen in the line chart topics menu
 '''
-main_layout=html.Div([dbc.Row([db_logo_img,db_header_text],
-                              style=dict(backgroundColor='white'),id='main_header' ),
-                      #html.Br(),
-
-                    dbc.Row([
-                        html.Div([
-
-                      dbc.Card(dbc.CardBody([tweets_num_text,
-                                                      dbc.Spinner([tweets_num_indicator], size="lg", color="primary",
-                                                                  type="border", fullscreen=False,
-                                                                  spinner_style=dict(marginTop=''))
-
-                                                      ])
-                                        , style=dict(backgroundColor='#f7f7f7'), id='card3',
-                                        className='info-card'),
-
-
-                      dbc.Card(dbc.CardBody([retweets_avg_text,
-                                                      dbc.Spinner([retweets_avg_indicator], size="lg", color="primary",
-                                                                  type="border", fullscreen=False,
-                                                                  spinner_style=dict(marginTop=''))
-
-                                                      ])
-                                        , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card4',
-                                        className='info-card'),
-
-                        dbc.Card(dbc.CardBody([likes_avg_text,
-                                                        dbc.Spinner([likes_avg_indicator], size="lg",
-                                                                    color="primary",
-                                                                    type="border", fullscreen=False,
-                                                                    spinner_style=dict(marginTop=''))
-
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card4',
-                                          className='info-card'),
-
-                        dbc.Card(dbc.CardBody([replies_avg_text,
-                                                        dbc.Spinner([replies_avg_indicator], size="lg",
-                                                                    color="primary",
-                                                                    type="border", fullscreen=False,
-                                                                    spinner_style=dict(marginTop=''))
-
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card5',
-                                          className='info-card'),
-
-                       dbc.Card(dbc.CardBody([countries_num_text,
-                                                        dbc.Spinner([countries_num_indicator], size="lg",
-                                                                    color="primary",
-                                                                    type="border", fullscreen=False,
-                                                                    spinner_style=dict(marginTop=''))
-
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7',marginLeft='1vw'), id='card6',
-                                          className='info-card'),
-                                           ],style=dict(display= 'flex', alignItems= 'center',
-                                                        justifyContent= 'center',width='100%'))
-                                            ]),
-                        html.Br(),
-
-                      dbc.Row([
-                        dbc.Col([dbc.Card(dbc.CardBody([date_chart_header,
-                                                        dbc.Spinner([date_chart_div], size="lg", color="primary", type="border",
-                                                                    fullscreen=False) , topics_div
+@app.callback([Output('cross_filter','data'),Output('topics_menu','value')],
+              [Input('map_fig','clickData'),Input('hor_bar_chart','clickData'),Input('clear_cross_filter','n_clicks')],
+              [State('cross_filter','data'),State('topics_menu','value'),State('map_location_filter','value')],
+              prevent_initial_call=True)
+def update_cross_filter(map_click,bar_click,n_clicks,filters,selected_topic,map_location='country'):
+    filters=dict(filters or no_filters)
+    triggered=dash.callback_context.triggered_id
 
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7'), id='card7',
-                                          className='charts-card'), html.Br()
-                                 ], xl=dict(size=5, offset=0), lg=dict(size=6, offset=0),
-                                md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
-
-                        dbc.Col([dbc.Card(dbc.CardBody([hor_bar_chart_header,
-                                                        dbc.Spinner([hor_bar_chart_div], size="lg", color="primary",
-                                                                    type="border",
-                                                                    fullscreen=False),
+    if triggered=='clear_cross_filter':
+        return no_filters,'All Topics' if filters['topic'] else dash.no_update
 
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7'), id='card8',
-                                          className='charts-card'), html.Br()
-                                 ], xl=dict(size=4, offset=0), lg=dict(size=6, offset=0),
-                                md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+    # the points of the cities map aren't countries
+    if triggered=='map_fig' and map_click and map_location=='country':
+        column,value=('country',map_click['points'][0]['text'])
+    elif triggered=='hor_bar_chart' and bar_click:
+        column,value=('topic',bar_click['points'][0]['y'])
+    else:
+        raise PreventUpdate
 
-                        dbc.Col([dbc.Card(dbc.CardBody([ver_bar_chart_header,
-                                                        dbc.Spinner([ver_bar_chart_div], size="lg", color="primary",
-                                                                    type="border",
-                                                                    fullscreen=False),location_filter
+    # one value is selected in each column , clicking the selected one again removes it
+    filters[column]=[] if filters[column]==[value] else [value]
 
-                                                        ])
-                                          , style=dict(backgroundColor='#f7f7f7'), id='card9',
-                                          className='charts-card'), html.Br()
-                                 ], xl=dict(size=3, offset=0), lg=dict(size=4, offset=0),
-                                md=dict(size=4, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+    if column=='topic':
+        selected_topic=filters['topic'][0] if filters['topic'] else 'All Topics'
+        return filters,selected_topic
+    return filters,dash.no_update
 
-                          dbc.Col([dbc.Card(dbc.CardBody([map_header,
-                                                          dbc.Spinner([map_div], size="lg", color="primary",
-                                                                      type="border",
-                                                                      fullscreen=False)
+'''
+showing the selected filters above the indicators
+'''
+@app.callback([Output('cross_filter_text','children'),Output('cross_filter_div','style')],
+              Input('cross_filter','data'))
+def show_cross_filter(filters):
+    selected=['{}: {}'.format(column.capitalize(),', '.join(values)) for column,values in (filters or no_filters).items() if values]
+    if not selected:
+        return '',dict(display='none')
+    return 'Filtered by '+' , '.join(selected),dict(display='flex',alignItems='center',justifyContent='center',
+                                                     paddingTop='1vh',fontSize='1.7vh')
 
-                                                          ])
-                                            , style=dict(backgroundColor='#f7f7f7'), id='card10',
-                                            className='map-card'), html.Br()
-                                   ], xl=dict(size=5, offset=0), lg=dict(size=6, offset=0),
-                                  md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                  style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+'''
+updating the header indicators and the charts made from all topics or all countries when the filters change
+or new tweets are read ( the horizontal bar chart isn't filtered by topic so another one can still be clicked )
 
-                          dbc.Col([dbc.Card(dbc.CardBody([word_cloud_header,
-                                                          dbc.Spinner([word_cloud], size="lg", color="primary",
-                                                                      type="border",
-                                                                      fullscreen=False),topics_menu_div2
+the indicators of each topic and country are counted with the tweets counts so they are only looked up
+'''
+@figure_cache.memoize('overview')
+def update_overview(filters,data_version):
+    filters=filters or no_filters
+    topic=filters['topic'][0] if filters['topic'] else None
+    country=filters['country'][0] if filters['country'] else None
 
-                                                          ])
-                                            , style=dict(backgroundColor='#f7f7f7'), id='card11',
-                                            className='map-card'), html.Br()
-                                   ], xl=dict(size=4, offset=0), lg=dict(size=6, offset=0),
-                                  md=dict(size=6, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                  style=dict(paddingLeft='0.5vw',paddingRight='0.5vw')),
+    filtered=filtered_cube(filters,data_version)
+    return (charts.create_indicator(cube.tweets_number(topic,country),valueformat=","),
+            charts.create_indicator(round(cube.average('tweet_retweet_count',topic,country) , 1),suffix="%"),
+            charts.create_indicator(int(cube.average('tweet_like_count',topic,country) ),suffix="%"),
+            charts.create_indicator(int(cube.average('tweet_reply_count',topic,country) ),suffix="%"),
+            charts.create_indicator(cube.countries_number(topic,country),valueformat=","),
+            charts.create_hor_bar(filtered_cube(filters,data_version,exclude='topic')),
+            charts.create_donut(filtered))
 
-                          dbc.Col([dbc.Card(dbc.CardBody([donut_header,
-                                                          dbc.Spinner([donut_div], size="lg", color="primary",
-                                                                      type="border",
-                                                                      fullscreen=False)
+app.callback([Output('tweets_num_indicator','figure'),Output('retweets_avg_indicator','figure'),
+              Output('likes_avg_indicator','figure'),Output('replies_avg_indicator','figure'),
+              Output('countries_num_indicator','figure'),Output('hor_bar_chart','figure'),
+              Output('donut_fig','figure')],
+             [Input('cross_filter','data'),Input('data_version','data')],prevent_initial_call=True)(update_overview)
 
-                                                          ])
-                                            , style=dict(backgroundColor='#f7f7f7'), id='card12',
-                                            className='map-card'), html.Br()
-                                   ], xl=dict(size=3, offset=0), lg=dict(size=4, offset=0),
-                                  md=dict(size=4, offset=0), sm=dict(size=12, offset=0), xs=dict(size=12, offset=0),
-                                  style=dict(paddingLeft='0.5vw', paddingRight='0.5vw'))
+'''
+updating the map depending on the countries/cities radio button , the filters and the new tweets read
+( the map isn't filtered by country so another one can still be clicked )
+'''
+@figure_cache.memoize('map')
+def update_map(map_location,filters,data_version):
+    header='Number of Tweets by {}'.format('City' if map_location=='city' else 'Country')
+    return (charts.create_countries_map(filtered_cube(filters,data_version,exclude='country'),map_location),header)
 
-                        ],className='g-0')
-                      ]
+app.callback([Output('map_fig','figure'),Output('map_header','children')],
+             [Input('map_location_filter','value'),Input('cross_filter','data'),Input('data_version','data')],
+             prevent_initial_call=True)(update_map)
 
-                     )
+'''
+searching the tweets with the query and the filters selected and showing one page of the results
+( a new query or filter goes back to the first page )
+'''
+def update_search(query,topic,sentiment,country,page,data_version=None):
+    if dash.callback_context.triggered_id!='search_results':
+        page=0
 
+    filters={column:[value] for column,value in (('topic',topic),('sentiment',sentiment),('country',country))
+             if value is not None}
+    total,results=search_index.search(query,filters,page,search.PAGE_SIZE)
 
+    results=results.assign(created=results['created'].astype(str),
+                           sentiment=results['sentiment'].map(charts.sent_dict),
+                           topic=results['topic'].astype(str),country=results['country'].astype(str),
+                           text=results['text'].astype(str))
+    page_count=max(-(-total//search.PAGE_SIZE),1)
+    text='{:,} tweets found'.format(total) if search.parse_query(query) else ''
+    return results.to_dict('records'),page_count,page,text
 
-
-app.layout = html.Div([dbc.Spinner([html.Div(id='layout')],size="lg", color="primary", type="border", fullscreen=True,id='spinner')
-,dcc.Location(id='url', refresh=True,pathname='/Dashboard')
-                       ], style=dict(backgroundColor='white'), className='main',
-                      id='main_div')
+if dataset.INGEST_MODE!='chunked':
+    app.callback([Output('search_results','data'),Output('search_results','page_count'),
+                  Output('search_results','page_current'),Output('search_count','children')],
+                 [Input('search_query','value'),Input('search_topic','value'),Input('search_sentiment','value'),
+                  Input('search_country','value'),Input('search_results','page_current'),
+                  Input('data_version','data')])(update_search)
 
 '''
-setting the landing page url extension to /Dashboard and loading app.layout there
+updating the wordcloud depending on topic selected
 '''
-@app.callback([Output('layout','children'),Output('spinner','delay_show')],Input('url','pathname'))
-def landing_page(pathname):
-    if pathname=='/Dashboard':
-        return (main_layout,60000 )
-    else:
-        return (dash.no_update ,dash.no_update)
-
+def update_word_cloud(selected_topic):
+    if dash.callback_context.triggered_id=='topics_menu2':
+        precompute.scheduler.record_request(selected_topic)
+    return word_cloud_url(selected_topic)
 
 '''
-updating the line chart depending on topic selected
+in clientside mode the line chart , vertical bar chart and word cloud are switched in the browser from the view_data store
+( functions in assets/clientside.js ) and the server only makes the store again when new tweets are read ,
+otherwise the callbacks above run on the server
 '''
-@app.callback(Output('date_chart','figure'),Input('topics_menu','value'))
-def update_date_chart(selected_topic):
-    fig=go.Figure()
-    graph_data = df.copy()
-    graph_data.set_index('created',inplace=True) # setting the index to 'created' column
-    sent_dict = {'1': 'Negative', '2': 'Neutral', '3': 'Positive'} # mapping sentiment numbers to text values
-    sent_colors= {'1': 'red', '2': '#e3a817', '3': 'green'} # mapping sentiment numbers to colors
+if clientside.CLIENTSIDE_MODE:
+    app.clientside_callback(ClientsideFunction(namespace='dashboard',function_name='date_chart'),
+                            Output('date_chart','figure'),[Input('topics_menu','value'),Input('view_data','data')])
+    app.clientside_callback(ClientsideFunction(namespace='dashboard',function_name='ver_bar_chart'),
+                            [Output('ver_bar_chart','figure'),Output('ver_bar_chart_header','children')],
+                            [Input('location_filter','value'),Input('view_data','data')])
+    app.clientside_callback(ClientsideFunction(namespace='dashboard',function_name='word_cloud'),
+                            Output('word_cloud','src'),[Input('topics_menu2','value'),Input('view_data','data')])
 
-    # checking if selected topic is not all topics ( user choosed one topic )
-    if( selected_topic!='All Topics'):
-        graph_data=graph_data[graph_data['topic']==selected_topic] # filtering dataframe based on that topic
+    @app.callback(Output('view_data','data'),[Input('cross_filter','data'),Input('data_version','data')],
+                  prevent_initial_call=True)
+    def update_view_data(filters,data_version):
+        topics=[option['value'] for option in topic_options()]
+        return clientside.view_data(filtered_cube(filters,data_version,exclude='topic'),topics,word_cloud_urls(topics))
+else:
+    app.callback(Output('date_chart','figure'),
+                 [Input('topics_menu','value'),Input('date_chart','relayoutData'),Input('viewport','data'),
+                  Input('cross_filter','data'),Input('data_version','data')])(update_date_chart)
+    app.callback([Output('ver_bar_chart','figure'),Output('ver_bar_chart_header','children')],
+                 [Input('location_filter','value'),Input('cross_filter','data'),
+                  Input('data_version','data')])(update_ver_bar_chart)
+    app.callback(Output('word_cloud','src'),Input('topics_menu2','value'))(update_word_cloud)
 
-    for i in range(1,4):
-        data=graph_data[graph_data['sentiment']==str(i)] # looping through the data filtered with each sentiment
-        data=data.resample('1D').count() # getting the count of tweets for each day
+'''
+hits and misses of the figures cache
+'''
+@server.route('/cache_stats')
+def cache_stats():
+    return jsonify(dict(figure_cache.cache.stats))
 
-        # line chart
+'''
+making the figures of the views shown when the page opens and then of every topic ( of the topics_number first ones
+when it is given ) from the most requested one in the background ( using precompute.py file ) , the callbacks get
+them from the figures cache or wait for the ones being made ( in clientside mode the line chart , vertical bar chart
+and word cloud are made in the browser ) , with gunicorn only one worker makes them
+'''
+def warm_views(data_version,topics_number=None):
+    if not precompute.scheduler.is_warmer():
+        return
 
-        fig.add_trace(
-            go.Scatter(x=data.index, y=data['tweetId'].astype('int64'), mode='lines', name=sent_dict[str(i)],
-                       marker_color=sent_colors[str(i)]
-                       #, stackgroup='one'
-                       ))
+    views=[('overview',update_overview,(no_filters,data_version))]
+    views+=[('map',update_map,(location,no_filters,data_version))
+            for location in ['country','city'] if location=='country' or cube.city_points is not None]
+    if not clientside.CLIENTSIDE_MODE:
+        views+=[('ver_bar_chart',update_ver_bar_chart,(location,no_filters,data_version)) for location in ['city','country']]
 
-    fig.update_layout(
-        xaxis_title='<b>Date<b>', yaxis_title='<b>Number of Tweets<b>',
-        font=dict(size=14, family='Arial', color='black'), hoverlabel=dict(
-            font_size=14, font_family="Rockwell", font_color='black', bgcolor='white'), plot_bgcolor='#f7f7f7',
-        paper_bgcolor='#f7f7f7',
-        xaxis=dict(
+    # the topic shown when the page opens first
+    topics=precompute.scheduler.rank_topics([option['value'] for option in topic_options()])
+    topics=sorted(topics,key=lambda topic:topic!='All Topics')[:topics_number]
+    budgets=sorted({downsampling.points_budget(width) for width in precompute.VIEWPORT_WIDTHS})
+    for topic in topics:
+        views.append(('trending_chart',trending_chart_figure,(topic,None,data_version)))
+        if not clientside.CLIENTSIDE_MODE:
+            views+=[('date_chart',date_chart_figure,(topic,None,None,max_points,no_filters,data_version))
+                    for max_points in budgets]
 
-            tickwidth=2, tickcolor='#80ced6',
-            ticks="outside",
-            tickson="labels",
-            rangeslider_visible=False
-        ),margin=dict(l=0, r=0, t=30, b=0)
-    )
-    fig.update_xaxes(showgrid=False, showline=True, zeroline=False, linecolor='black')
-    fig.update_yaxes(showgrid=False, showline=True, zeroline=False, linecolor='black')
-    return fig
+    for priority,(view,func,args) in enumerate(views):
+        key=figure_cache.cache.key(view,args)
+        precompute.scheduler.submit(view,func,args,priority,functools.partial(figure_cache.cache.ready,key))
 
 '''
-updating the vertical bar chart depending on radio button selected
+number of background jobs of each state ( queued , running , ready or failed )
 '''
-@app.callback([Output('ver_bar_chart','figure'),Output('ver_bar_chart_header','children')],
-              Input('location_filter','value'))
-def update_ver_bar_chart(selected_location):
-    # checking if user choosed countries or cities and set the loc parameter that will be sent to the charts.py function according to it
-    if selected_location=='city':
-        loc='Cities'
-
-    elif selected_location=='country':
-        loc='Countries'
-
-    return (charts.create_ver_bar(df,selected_location), 'Top 5 {} With Tweets'.format(loc))
+@server.route('/precompute_status')
+def precompute_status():
+    return jsonify(precompute.scheduler.status())
 
 '''
-updating the wordcloud depending on topic selected
+timing the callbacks and showing the startup and callbacks timings and the figures cache hits and misses in /metrics
 '''
-@app.callback(Output('word_cloud','src'),Input('topics_menu2','value'))
-def update_word_cloud(selected_topic):
-
-    dire=os.path.join(THIS_FOLDER, '{}.png'.format(selected_topic))
+def cache_metrics():
+    return {'dashboard_figure_cache_requests_total': ('Figures cache hits ( in memory and on disk ) and misses',
+                                                      {(('result',result),):count for result,count in figure_cache.cache.stats.items()})}
 
-    encoded = base64.b64encode(open(dire, 'rb').read())
+instrumentation.register(server,app,cache_metrics)
+instrumentation.record_phase('startup',time.perf_counter()-startup_start)
 
-    return 'data:image/jpg;base64,{}'.format(encoded.decode())
 if __name__ == '__main__':
     app.run_server(host='localhost',port=8044,debug=False,dev_tools_silence_routes_logging=True)
\ No newline at end of file
@@ -0,0 +1,99 @@
+'''
+points of the map made from the tweets counts by location and coordinates ( counted once in aggregates.py file )
+
+countries are shown as one point each , cities ( when the dataset has city_lon and city_lat columns ) are shown
+one point each while there are up to MAX_POINTS of them , otherwise nearby cities are grouped in hexagons
+so the map never receives tens of thousands of points
+'''
+import os
+import numpy as np
+import pandas as pd
+
+'''
+maximum number of points sent to the map ( set with DASHBOARD_MAP_MAX_POINTS )
+'''
+MAX_POINTS = int(os.environ.get('DASHBOARD_MAP_MAX_POINTS', 2000))
+
+'''
+radius in degrees of the hexagons tried from the smallest until the cities fit in MAX_POINTS hexagons
+'''
+HEX_SIZES = [0.1, 0.25, 0.5, 1, 2, 4, 8, 16]
+
+'''
+decimals kept of the coordinates ( 4 decimals are about 10 meters )
+'''
+COORDINATE_DECIMALS = 4
+
+point_columns = ['name', 'lon', 'lat', 'tweets']
+
+
+def to_points(counts, name_column, lon_column, lat_column):
+    counts = counts.sort_index().reset_index()
+    points = pd.DataFrame({'name': counts[name_column].astype(str),
+                           'lon': counts[lon_column].astype('float64').round(COORDINATE_DECIMALS),
+                           'lat': counts[lat_column].astype('float64').round(COORDINATE_DECIMALS),
+                           'tweets': counts['tweetId'].astype('int64')})
+    return points.sort_values('tweets', ascending=False, kind='stable', ignore_index=True)
+
+
+'''
+one point for each country
+'''
+def country_points(aggregates):
+    return to_points(aggregates.map_points, 'country', 'country_lon', 'country_lat')
+
+
+'''
+hexagon of a hex grid of radius size ( in degrees ) each point is in , as axial coordinates (q, r)
+'''
+def hex_cells(lon, lat, size):
+    q = (np.sqrt(3) / 3 * lon - lat / 3) / size
+    r = (2 / 3 * lat) / size
+
+    # rounding the cube coordinates (q, -q-r, r) to the nearest hexagon
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype('int64'), rr.astype('int64')
+
+
+'''
+grouping points in hexagons , each hexagon is placed at the tweets weighted center of its points
+and named after its point with the most tweets
+'''
+def hex_bin(points, size):
+    q, r = hex_cells(points['lon'].to_numpy(), points['lat'].to_numpy(), size)
+    cells = points.assign(q=q, r=r, lon_tweets=points['lon'] * points['tweets'], lat_tweets=points['lat'] * points['tweets'])
+
+    # points are sorted by tweets so the first one of each hexagon has the most tweets
+    grouped = cells.groupby(['q', 'r'], sort=False)
+    bins = grouped.agg(name=('name', 'first'), places=('name', 'size'), tweets=('tweets', 'sum'),
+                       lon_tweets=('lon_tweets', 'sum'), lat_tweets=('lat_tweets', 'sum'))
+
+    others = bins['places'] - 1
+    bins['name'] = bins['name'].where(others == 0, bins['name'] + ' +' + others.astype(str))
+    bins['lon'] = (bins['lon_tweets'] / bins['tweets']).round(COORDINATE_DECIMALS)
+    bins['lat'] = (bins['lat_tweets'] / bins['tweets']).round(COORDINATE_DECIMALS)
+    return bins[point_columns].sort_values('tweets', ascending=False, kind='stable', ignore_index=True)
+
+
+'''
+one point for each city or one point for each hexagon of nearby cities when there are more than max_points cities
+( None when the dataset has no city coordinates )
+'''
+def city_points(aggregates, max_points=None):
+    if aggregates.city_points is None:
+        return None
+
+    max_points = max_points or MAX_POINTS
+    cities = to_points(aggregates.city_points, 'city', 'city_lon', 'city_lat')
+    points = cities
+    for size in HEX_SIZES:
+        if len(points) <= max_points:
+            break
+        points = hex_bin(cities, size)
+    return points
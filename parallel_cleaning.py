@@ -0,0 +1,129 @@
+'''
+cleaning the text column in a pool of processes
+
+the column is split in partitions that are cleaned with charts.clean_text_column in each process ,
+each process writes its cleaned partition as an arrow stream in shared memory so the large lists of strings
+aren't pickled back , the partitions are put back in their order so the result is the same as cleaning in one process
+'''
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+import charts
+
+'''
+number of processes cleaning the text ( 1 cleans in the app process , can be changed with the
+DASHBOARD_CLEAN_WORKERS environment variable ) and the least number of rows worth starting the processes for
+'''
+WORKERS = int(os.environ.get('DASHBOARD_CLEAN_WORKERS', 1))
+MIN_PARALLEL_ROWS = 50000
+
+'''
+number of partitions given to each process ( smaller partitions balance the work between processes )
+'''
+PARTITIONS_PER_WORKER = 4
+
+'''
+columns being cleaned , forked processes read their partition from here instead of receiving it pickled
+'''
+source = None
+
+
+def write_shared(values):
+    import pyarrow as pa
+
+    table = pa.table({'text': pa.array(values, type=pa.large_string())})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    data = sink.getvalue()
+
+    memory = shared_memory.SharedMemory(create=True, size=max(data.size, 1))
+    memory.buf[:data.size] = np.frombuffer(data, dtype=np.uint8)
+    memory.close()
+    # the app process unlinks the block once it is read , the resource tracker of the worker mustn't remove it too
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory.name, data.size
+
+
+def read_shared(name, size):
+    import pyarrow as pa
+
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(memory.buf[:size])
+    finally:
+        memory.close()
+        memory.unlink()
+
+    table = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+    return table.column('text').to_numpy(zero_copy_only=False)
+
+
+'''
+removing the shared memory of a partition that was cleaned but won't be read ( another partition failed )
+'''
+def discard_shared(result):
+    if not result.done() or result.cancelled() or result.exception() is not None:
+        return
+    name, size = result.result()
+    try:
+        memory = shared_memory.SharedMemory(name=name)
+        memory.close()
+        memory.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def clean_partition(start, stop, texts=None, languages=None):
+    if texts is None:
+        texts = source[0][start:stop]
+        languages = None if source[1] is None else source[1][start:stop]
+
+    cleaned = charts.clean_text_column(pd.Series(texts, dtype=object),
+                                       None if languages is None else pd.Series(languages, dtype=object))
+    return write_shared(cleaned.to_numpy())
+
+
+def clean_text_column(texts, languages=None, workers=None):
+    global source
+    workers = workers or WORKERS
+    if workers <= 1 or len(texts) < MIN_PARALLEL_ROWS:
+        return charts.clean_text_column(texts, languages)
+
+    text_values = texts.to_numpy(dtype=object)
+    language_values = None if languages is None else languages.to_numpy(dtype=object)
+    bounds = np.linspace(0, len(texts), workers * PARTITIONS_PER_WORKER + 1).astype(int)
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        source = (text_values, language_values)
+        jobs = [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    else:
+        context = None
+        jobs = [(start, stop, text_values[start:stop],
+                 None if language_values is None else language_values[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    results = []
+    partitions = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = [executor.submit(clean_partition, *job) for job in jobs]
+            try:
+                for result in results:
+                    partitions.append(read_shared(*result.result()))
+            except BaseException:
+                # the partitions that didn't start aren't needed anymore
+                for result in results:
+                    result.cancel()
+                raise
+    finally:
+        source = None
+        # leaving the pool waits for the running partitions , the ones after the failed one were never read
+        for result in results[len(partitions) + 1:]:
+            discard_shared(result)
+
+    return pd.Series(np.concatenate(partitions), index=texts.index, name=texts.name, dtype=object)
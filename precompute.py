@@ -0,0 +1,261 @@
+'''
+making the figures of every topic in background threads when the app starts so the first user choosing a topic
+doesn't wait for its line chart , trending terms and word cloud
+
+each job is a view ( a cached callback function of main.py ) with its inputs , jobs are run in priority order :
+the views shown when the page opens first and then the views of each topic from the most requested topics
+( topics chosen in the menus are counted in REQUESTS_FILE so the order is kept after a restart ) to the least
+
+a job is only queued once , the figures made are saved in the figures cache ( figure_cache.py ) and a callback
+asking for a figure that is being made waits for it there , so the same figure is never made twice
+
+with gunicorn only one worker makes the figures in the background ( the one holding a lock on WARMER_FILE , another
+worker takes the lock when it stops ) , the figures cache folder is shared so the other workers read them from there ,
+the requests counts of all workers are added in REQUESTS_FILE
+'''
+import atexit
+import collections
+import concurrent.futures
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import dataset
+
+try:
+    import fcntl
+except ImportError:
+    # without file locks ( windows ) every process makes the figures
+    fcntl = None
+
+'''
+number of threads making the figures ( set with DASHBOARD_PRECOMPUTE_WORKERS , 0 doesn't make them in the background )
+'''
+WORKERS = int(os.environ.get('DASHBOARD_PRECOMPUTE_WORKERS', 2))
+
+'''
+file where the number of times each topic was chosen is kept
+'''
+REQUESTS_FILE = os.path.join(dataset.CACHE_DIR, 'topic_requests.json')
+
+'''
+seconds between two writes of the requests counts of a process to REQUESTS_FILE
+'''
+FLUSH_SECONDS = 30
+
+'''
+file locked by the process making the figures in the background
+'''
+WARMER_FILE = os.path.join(dataset.CACHE_DIR, 'precompute.lock')
+
+'''
+number of topics ( from the most requested ) whose figures are made again when new tweets are read
+( set with DASHBOARD_PRECOMPUTE_REFRESH_TOPICS , the other topics are made when they are chosen )
+'''
+REFRESH_TOPICS = int(os.environ.get('DASHBOARD_PRECOMPUTE_REFRESH_TOPICS', 3))
+
+'''
+browser widths the line charts are made for ( the number of points of the line chart depends on the browser width ,
+set with DASHBOARD_PRECOMPUTE_WIDTHS as comma separated widths )
+'''
+VIEWPORT_WIDTHS = [int(width) for width in os.environ.get('DASHBOARD_PRECOMPUTE_WIDTHS', '1366,1536,1920').split(',') if width]
+
+
+'''
+holding an exclusive lock on an open file while the with block runs ( nothing is locked without fcntl )
+'''
+class FileLock:
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self.f
+
+    def __exit__(self, *error):
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+
+
+class Scheduler:
+    def __init__(self, workers, requests_file, warmer_file):
+        self.workers = workers
+        self.requests_file = requests_file
+        self.warmer_file = warmer_file
+        self.warmer = None  # locked file while this process is the one making the figures
+        self.queue = queue.PriorityQueue()
+        self.order = itertools.count()  # keeps the jobs of the same priority in the order they were added
+        self.futures = {}  # job key -> future of the job
+        self.states = {}  # job key -> 'queued' , 'running' , 'ready' or 'failed'
+        self.stale = set()  # keys of running jobs of an older version , forgotten when they end
+        self.threads = []
+        self.lock = threading.Lock()
+        self.file_lock = threading.Lock()  # one thread of the process writes the requests file at a time
+        self.flusher = None  # thread writing the requests counts every FLUSH_SECONDS seconds
+        self.requests = collections.Counter(self.load_requests())
+        self.new_requests = collections.Counter()  # requests of this process not added to the file yet
+
+    def load_requests(self):
+        try:
+            with open(self.requests_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    '''
+    counting a topic chosen by a user in memory , the counts are written to the file in a background thread
+    '''
+    def record_request(self, topic):
+        if topic is None:
+            return
+        with self.lock:
+            self.new_requests[topic] += 1
+            self.requests[topic] += 1
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self.flush_periodically, name='precompute-requests', daemon=True)
+                self.flusher.start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            self.flush_requests()
+
+    '''
+    adding the counts of this process to the counts of the file ( written by every process ) under a lock of the file
+    so no process overwrites the others counts , the counts of the other processes are read back for the ranking
+    '''
+    def flush_requests(self):
+        with self.lock:
+            if not self.new_requests:
+                self.requests = collections.Counter(self.load_requests())
+                return
+
+        os.makedirs(os.path.dirname(self.requests_file), exist_ok=True)
+        with self.file_lock, open(self.requests_file + '.lock', 'a') as lock_file, FileLock(lock_file):
+            with self.lock:
+                new_requests, self.new_requests = self.new_requests, collections.Counter()
+            requests = collections.Counter(self.load_requests())
+            requests.update(new_requests)
+
+            temp_file = '{}.{}.tmp'.format(self.requests_file, os.getpid())
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(dict(requests), f)
+            os.replace(temp_file, self.requests_file)
+
+        with self.lock:
+            self.requests = requests + self.new_requests
+
+    '''
+    True when this process makes the figures in the background : the first process locking warmer_file keeps the lock
+    until it stops ( every process without fcntl )
+    '''
+    def is_warmer(self):
+        if not self.workers:
+            return False
+        if fcntl is None or self.warmer is not None:
+            return True
+
+        os.makedirs(os.path.dirname(self.warmer_file), exist_ok=True)
+        f = open(self.warmer_file, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self.warmer = f
+        return True
+
+    '''
+    topics from the most requested to the least ( topics never requested keep their order )
+    '''
+    def rank_topics(self, topics):
+        with self.lock:
+            return sorted(topics, key=lambda topic: -self.requests[topic])
+
+    def key(self, view, args):
+        return json.dumps([view, args], default=str)
+
+    '''
+    adding a job running func(*args) for a view , lower priorities run first , ready is a function returning True when
+    the result is already cached ( checked when the job is added and again when it starts ) , returns the future of
+    the job ( the future of the job already added for the same view and inputs , None when there are no workers )
+    '''
+    def submit(self, view, func, args, priority=0, ready=None):
+        if not self.workers:
+            return None
+
+        key = self.key(view, args)
+        with self.lock:
+            if key in self.futures:
+                return self.futures[key]
+
+            future = self.futures[key] = concurrent.futures.Future()
+            if ready is not None and ready():
+                self.states[key] = 'ready'
+                future.set_result(None)
+                return future
+
+            self.states[key] = 'queued'
+            self.queue.put((priority, next(self.order), key, func, args, ready))
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self.run, name='precompute-{}'.format(len(self.threads)), daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            return future
+
+    def run(self):
+        while True:
+            priority, order, key, func, args, ready = self.queue.get()
+            with self.lock:
+                future = self.futures.get(key)
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+                self.states[key] = 'running'
+
+            # the figure is kept in the figures cache , not in the job ( a callback may have made it since it was added )
+            try:
+                if ready is None or not ready():
+                    func(*args)
+            except Exception as error:
+                self.end(key, 'failed')
+                future.set_exception(error)
+            else:
+                self.end(key, 'ready')
+                future.set_result(None)
+
+    def end(self, key, state):
+        with self.lock:
+            if key in self.stale:
+                self.stale.discard(key)
+                self.futures.pop(key, None)
+                self.states.pop(key, None)
+            else:
+                self.states[key] = state
+
+    '''
+    cancelling the jobs that didn't start and forgetting the others ( the figures of an older version of the dataset ) ,
+    the running jobs are forgotten when they end
+    '''
+    def cancel_queued(self):
+        with self.lock:
+            for key, state in list(self.states.items()):
+                if state == 'running':
+                    self.stale.add(key)
+                    continue
+                self.futures.pop(key).cancel()
+                del self.states[key]
+
+    '''
+    number of jobs in each state
+    '''
+    def status(self):
+        with self.lock:
+            return dict(collections.Counter(self.states.values()))
+
+
+scheduler = Scheduler(WORKERS, REQUESTS_FILE, WARMER_FILE)
+# the counts not written yet are written when the process stops
+atexit.register(scheduler.flush_requests)
@@ -0,0 +1,123 @@
+'''
+full text search of the tweets : an inverted index from each word of the cleaned text to the positions of the tweets using it
+
+the words of each tweet are the words of its cleaned text ( punctuation , stop words , short words and numbers are
+already removed by the cleaning so splitting on spaces gives the same words as tokenizing it ) in lower case ,
+split once in token_store.py file , the vocabulary is sorted so the words starting with a prefix are a range of it
+
+queries are words that all have to be in the tweet ( AND is optional ) , OR between groups of words
+and a * at the end of a word for all words starting with it , e.g. runway pilot OR airl*
+'''
+import numpy as np
+import pandas as pd
+import charts
+import cross_filter
+import token_store
+
+'''
+number of tweets shown in each page of the results table
+'''
+PAGE_SIZE = 10
+
+'''
+columns the results can be filtered by
+'''
+filter_columns = ['topic', 'sentiment', 'country']
+
+'''
+columns shown in the results table
+'''
+result_columns = ['created', 'topic', 'sentiment', 'country', 'text']
+
+
+class TokenIndex:
+    def __init__(self, tokens):
+        # tweets of each lower case word of the token store ( the vocabulary is sorted )
+        self.vocabulary = tokens.lower_vocabulary
+        self.offsets, self.postings = tokens.postings()
+
+    '''
+    positions of the tweets using a word ( or any word starting with it when prefix is True )
+    '''
+    def positions(self, word, prefix=False):
+        start = np.searchsorted(self.vocabulary, word)
+        if prefix:
+            end = np.searchsorted(self.vocabulary, word + '\U0010ffff')
+        else:
+            end = start + 1 if start < len(self.vocabulary) and self.vocabulary[start] == word else start
+
+        positions = self.postings[self.offsets[start]:self.offsets[end]]
+        return np.unique(positions) if end - start > 1 else positions
+
+
+'''
+splitting a query into groups of ( word , prefix ) that are or-ed , words of a group are and-ed
+'''
+def parse_query(query):
+    groups = [[]]
+    for word in (query or '').split():
+        if word == 'OR':
+            groups.append([])
+            continue
+        if word == 'AND':
+            continue
+
+        prefix = word.endswith('*')
+        word = charts.puncts_pattern.sub('', word.lower())
+        if word:
+            groups[-1].append((word, prefix))
+
+    return [group for group in groups if group]
+
+
+class SearchIndex:
+    def __init__(self, columns=filter_columns):
+        self.columns = columns
+        # (dataframe, (TokenIndex, RowIndex)) of the dataset and of the parts read while the app runs ( merged like
+        # the parts of the cross filter )
+        self.segments = cross_filter.Segments(
+            lambda df: (TokenIndex(token_store.of(df)), cross_filter.RowIndex(df, self.columns)))
+
+    def add(self, df):
+        self.segments.add(df)
+
+    '''
+    positions of the tweets of one segment matching the query and the filters ( a dict of column -> list of values )
+    '''
+    def match(self, tokens, rows, groups, filters):
+        matched = None
+        for group in groups:
+            positions = None
+            for word, prefix in sorted(group, key=lambda term: term[1]):
+                word_positions = tokens.positions(word, prefix)
+                positions = word_positions if positions is None else np.intersect1d(positions, word_positions,
+                                                                                    assume_unique=True)
+                if not len(positions):
+                    break
+            matched = positions if matched is None else np.union1d(matched, positions)
+
+        if filters:
+            matched = rows.keep(matched, filters)
+        return matched
+
+    '''
+    number of tweets matching the query and the filters and the tweets of one page of the results
+    '''
+    def search(self, query, filters=None, page=0, page_size=PAGE_SIZE):
+        groups = parse_query(query)
+        if not groups:
+            return 0, pd.DataFrame(columns=result_columns)
+
+        total, parts = 0, []
+        start, end = page * page_size, (page + 1) * page_size
+        for df, (tokens, rows) in self.segments:
+            matched = self.match(tokens, rows, groups, filters)
+            # positions of this segment in the page
+            page_positions = matched[max(start - total, 0):max(end - total, 0)]
+            if len(page_positions):
+                parts.append(df.iloc[page_positions][result_columns])
+            total += len(matched)
+
+        if not parts:
+            return total, pd.DataFrame(columns=result_columns)
+        return total, pd.concat(parts, ignore_index=True)
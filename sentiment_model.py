@@ -0,0 +1,195 @@
+'''
+scoring the sentiment of tweets ( 1 negative , 2 neutral , 3 positive ) so the csv file doesn't need a sentiment column
+
+the model is a multinomial naive bayes over hashed features : the words of the cleaned text in lower case
+( from token_store.py file ) and the pairs of following words are hashed to N_FEATURES columns , each tweet is a row
+of a sparse matrix kept as numpy arrays ( indptr , indices ) so a batch of tweets is scored with one gather and one cumulative sum per sentiment
+instead of a python loop over the tweets
+
+the model is trained from the tweets of a dataset that have a sentiment and saved in MODEL_FILE when the whole csv file
+is loaded ( or with python sentiment_model.py from twitter_dataset.csv ) , it is never trained from the new tweets read
+while the app runs : without a saved model the new tweets without a sentiment are left out with a warning
+
+the saved model keeps the source key of the dataset it was trained from ( see dataset.py file ) so the dataset
+key stays the same before and after the model trained from that dataset is saved
+'''
+import logging
+import os
+import zlib
+import numpy as np
+import token_store
+
+logger = logging.getLogger(__name__)
+
+THIS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+'''
+file of the trained model ( set with DASHBOARD_SENTIMENT_MODEL )
+'''
+MODEL_FILE = os.environ.get('DASHBOARD_SENTIMENT_MODEL', os.path.join(THIS_FOLDER, 'sentiment_model.npz'))
+
+'''
+number of hashed features and the smoothing of the words counts
+'''
+N_FEATURES = 2 ** 18
+ALPHA = 1.0
+
+sentiments = np.array([1, 2, 3], dtype='int8')
+
+
+'''
+sparse matrix of hashed features of the tweets of a token store ( or texts ) as ( indptr , indices ) , the features of
+tweet i are indices[indptr[i]:indptr[i + 1]] ( a feature used twice is in it twice )
+'''
+def hashed_features(tokens, n_features=N_FEATURES):
+    if not isinstance(tokens, token_store.TokenStore):
+        tokens = token_store.TokenStore(tokens)
+    rows = tokens.rows()
+
+    # hashing each distinct lower case word once ( crc32 is the same in every process unlike python hash )
+    word_hashes = np.array([zlib.crc32(word.encode()) for word in tokens.lower_vocabulary], dtype='int64')
+    hashes = word_hashes[tokens.lower_ids()]
+
+    # pairs of following words of the same tweet
+    same_tweet = rows[1:] == rows[:-1]
+    pair_hashes = (hashes[:-1][same_tweet] * 1000003 + hashes[1:][same_tweet]) % (2 ** 32)
+    pair_rows = rows[1:][same_tweet]
+
+    all_rows = np.concatenate([rows, pair_rows])
+    order = np.argsort(all_rows, kind='stable')
+    indices = (np.concatenate([hashes, pair_hashes]) % n_features)[order].astype('int32')
+    indptr = np.zeros(len(tokens) + 1, dtype='int64')
+    np.cumsum(np.bincount(all_rows, minlength=len(tokens)), out=indptr[1:])
+    return indptr, indices
+
+
+class SentimentModel:
+    def __init__(self, log_priors, log_probabilities, trained_from=''):
+        self.log_priors = log_priors  # log probability of each sentiment
+        self.log_probabilities = log_probabilities  # log probability of each feature in the tweets of each sentiment
+        self.trained_from = trained_from  # source key of the dataset the model was trained from
+
+    @classmethod
+    def train(cls, texts, labels, trained_from='', n_features=N_FEATURES, alpha=ALPHA):
+        return cls.train_batches([(texts, labels)], trained_from, n_features, alpha)
+
+    '''
+    training the model from batches of ( cleaned texts , sentiments ) , the features counts of the batches are added
+    so all the texts don't have to be in memory at once ( None when the batches have no tweets )
+    '''
+    @classmethod
+    def train_batches(cls, batches, trained_from='', n_features=N_FEATURES, alpha=ALPHA):
+        counts = np.zeros(len(sentiments) * n_features, dtype='int64')
+        tweets = np.zeros(len(sentiments), dtype='int64')
+        for texts, labels in batches:
+            indptr, indices = hashed_features(texts, n_features)
+            classes = np.searchsorted(sentiments, np.asarray(labels, dtype='int64'))
+
+            # counts of each feature in the tweets of each sentiment
+            feature_classes = np.repeat(classes, np.diff(indptr))
+            counts += np.bincount(feature_classes * n_features + indices, minlength=len(sentiments) * n_features)
+            tweets += np.bincount(classes, minlength=len(sentiments))
+
+        if not tweets.sum():
+            return None
+
+        counts = counts.reshape(len(sentiments), n_features) + alpha
+        log_probabilities = np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))
+        log_priors = np.log(tweets + 1) - np.log((tweets + 1).sum())
+        return cls(log_priors, log_probabilities.astype('float32'), trained_from)
+
+    '''
+    sentiment ( 1 , 2 or 3 ) of each text ( texts can be a token store )
+    '''
+    def predict(self, texts):
+        indptr, indices = hashed_features(texts, self.log_probabilities.shape[1])
+
+        scores = np.empty((len(sentiments), len(indptr) - 1), dtype='float64')
+        for c in range(len(sentiments)):
+            # sum of the features log probabilities of each tweet from the cumulative sum over all the features
+            cumulative = np.concatenate([[0.0], np.cumsum(self.log_probabilities[c][indices], dtype='float64')])
+            scores[c] = self.log_priors[c] + cumulative[indptr[1:]] - cumulative[indptr[:-1]]
+
+        return sentiments[scores.argmax(axis=0)]
+
+    def save(self, path):
+        temp_file = '{}.{}.tmp.npz'.format(path, os.getpid())
+        np.savez(temp_file, log_priors=self.log_priors, log_probabilities=self.log_probabilities,
+                 trained_from=np.array(self.trained_from))
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            trained_from = str(data['trained_from']) if 'trained_from' in data.files else ''
+            return cls(data['log_priors'], data['log_probabilities'], trained_from)
+
+
+model = None
+
+
+'''
+source key of the dataset the saved model was trained from ( '' when it isn't known , None when there is no saved model )
+'''
+def saved_model_source():
+    if not os.path.exists(MODEL_FILE):
+        return None
+    with np.load(MODEL_FILE) as data:
+        return str(data['trained_from']) if 'trained_from' in data.files else ''
+
+
+'''
+the saved model ( None if it isn't trained yet ) , loaded once
+'''
+def load_model():
+    global model
+    if model is None and os.path.exists(MODEL_FILE):
+        model = SentimentModel.load(MODEL_FILE)
+    return model
+
+
+'''
+filling the sentiment of the tweets without one ( or of all tweets when the csv file has no sentiment column ) ,
+the text column has to be cleaned already
+
+if there is no saved model and trained_from ( the source key of the dataset , given when the whole csv file is loaded )
+is given the model is trained from the tweets that have a sentiment and saved ( even when no tweet misses a sentiment
+so the new tweets read while the app runs can be scored ) , otherwise the tweets without a sentiment are left out
+'''
+def fill_sentiment(df, trained_from=None):
+    if 'sentiment' not in df.columns:
+        df['sentiment'] = np.nan
+    missing = df['sentiment'].isna().to_numpy()
+
+    global model
+    if load_model() is None and trained_from is not None and not missing.all():
+        model = SentimentModel.train(df['text'][~missing], df['sentiment'][~missing], trained_from)
+        model.save(MODEL_FILE)
+
+    if not missing.any():
+        return df
+
+    if model is None:
+        if trained_from is None:
+            logger.warning('%d tweets without a sentiment are left out , there is no trained sentiment model '
+                           '( python sentiment_model.py ) in %s', missing.sum(), MODEL_FILE)
+            return df[~missing].reset_index(drop=True)
+        raise ValueError('tweets without a sentiment column need a trained sentiment model '
+                         '( python sentiment_model.py ) in {}'.format(MODEL_FILE))
+
+    sentiment = df['sentiment'].to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    sentiment[missing] = model.predict(df['text'][missing])
+    df['sentiment'] = sentiment.astype('int64')
+    return df
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    import dataset
+
+    # only the tweets that have a sentiment are cleaned and used ( the others would be scored by the saved model )
+    csv_file = os.path.join(THIS_FOLDER, 'twitter_dataset.csv')
+    df = pd.read_csv(csv_file)
+    df = dataset.prepare_dataset(df[df['sentiment'].notna()].reset_index(drop=True))
+    SentimentModel.train(df['text'], df['sentiment'], dataset.source_key(csv_file)).save(MODEL_FILE)
+    print('sentiment model trained from {:,} tweets and saved in {}'.format(len(df), MODEL_FILE))
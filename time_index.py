@@ -0,0 +1,110 @@
+'''
+date indexed tweet counts for the line chart
+
+the hourly counts of each (topic, sentiment) are kept as sorted arrays with day and week rollups made once ( and added
+to when new tweets arrive ) ,
+a date range is cut from these arrays with a binary search ( no filtering of the whole dataset ) and the resolution
+is chosen so any range , from a few hours to years of tweets , returns at most MAX_POINTS points per line
+( or OVERSAMPLING times the points budget of downsampling.py file when the chart has one )
+'''
+import numpy as np
+import pandas as pd
+import downsampling
+
+'''
+max number of points of each line of the chart when there is no points budget
+'''
+MAX_POINTS = 1000
+
+'''
+resolutions from the finest one , with the length of one point
+'''
+resolutions = [('hour', pd.Timedelta(hours=1)), ('day', pd.Timedelta(days=1)), ('week', pd.Timedelta(weeks=1))]
+
+
+'''
+adding counts to the counts of a series at one resolution ( times one length apart with no gap ) , the series is only
+made longer when the new times are out of its range
+'''
+def add_points(times, counts, new_times, new_counts, length):
+    length = length.to_timedelta64()
+    start, end = min(times[0], new_times[0]), max(times[-1], new_times[-1])
+    if start < times[0] or end > times[-1]:
+        grown = np.zeros((end - start) // length + 1, dtype='int64')
+        first = (times[0] - start) // length
+        grown[first:first + len(counts)] = counts
+        times, counts = start + np.arange(len(grown)) * length, grown
+    np.add.at(counts, (new_times - start) // length, new_counts)
+    return times, counts
+
+
+class TimeIndex:
+    def __init__(self, hourly):
+        self.series = {}  # (topic, sentiment) -> {resolution: (times, counts)}
+        self.spans = {}  # topic -> (first hour, last hour)
+        self.add(hourly)
+
+    '''
+    adding hourly counts by (topic, sentiment, hour) , only the series of the topics and sentiments of these counts
+    are changed so the counts of new tweets are added without making the whole index again
+    '''
+    def add(self, hourly):
+        topics = list(hourly.index.get_level_values('topic').unique())
+        for topic in topics + ['All Topics']:
+            data = hourly
+            if topic != 'All Topics':
+                data = data[data.index.get_level_values('topic') == topic]
+
+            for sentiment in data.index.get_level_values('sentiment').unique():
+                counts = data[data.index.get_level_values('sentiment') == sentiment].groupby(level='created').sum()
+                self.add_series(topic, sentiment, counts)
+
+    def add_series(self, topic, sentiment, counts):
+        # filling the hours without tweets with zeros and making the rollups
+        hours = counts.resample('1h').sum()
+        rollups = dict(hour=hours, day=hours.resample('1D').sum(),
+                       week=hours.resample('W-MON', label='left', closed='left').sum())
+        series = {name: (data.index.to_numpy(), data.to_numpy(dtype='int64')) for name, data in rollups.items()}
+        if (topic, sentiment) in self.series:
+            series = {name: add_points(*self.series[topic, sentiment][name], *series[name], length)
+                      for name, length in resolutions}
+        self.series[topic, sentiment] = series
+
+        first, last = hours.index[0], hours.index[-1]
+        if topic in self.spans:
+            first, last = min(first, self.spans[topic][0]), max(last, self.spans[topic][1])
+        self.spans[topic] = (first, last)
+
+    '''
+    finest resolution giving at most MAX_POINTS points ( OVERSAMPLING times max_points , the points budget , when it is
+    given ) between start and end ( the whole topic span when None ) ,
+    the chart that isn't zoomed is at least daily like before the hourly counts were kept
+    '''
+    def resolution(self, selected_topic, start=None, end=None, max_points=None):
+        max_points = MAX_POINTS if max_points is None else max_points * downsampling.OVERSAMPLING
+        if selected_topic not in self.spans:
+            return 'day'
+        first, last = self.spans[selected_topic]
+        span = (pd.Timestamp(end) if end is not None else last) - (pd.Timestamp(start) if start is not None else first)
+
+        allowed = resolutions if start is not None or end is not None else resolutions[1:]
+        for name, length in allowed:
+            if span / length <= max_points:
+                return name
+        return resolutions[-1][0]
+
+    '''
+    times and counts of a sentiment of a topic between start and end at a resolution
+    '''
+    def query(self, selected_topic, sentiment, resolution, start=None, end=None):
+        if (selected_topic, sentiment) not in self.series:
+            return np.array([], dtype='datetime64[ns]'), np.array([], dtype='int64')
+        times, counts = self.series[selected_topic, sentiment][resolution]
+
+        first = 0 if start is None else np.searchsorted(times, np.datetime64(pd.Timestamp(start)), side='left')
+        last = len(times) if end is None else np.searchsorted(times, np.datetime64(pd.Timestamp(end)), side='right')
+
+        # keeping the point of the bin the range starts in
+        if start is not None and first > 0 and times[first - 1] < np.datetime64(pd.Timestamp(start)):
+            first -= 1
+        return times[first:last], counts[first:last]
@@ -0,0 +1,215 @@
+'''
+the words of the cleaned tweets split once and kept as integer ids , shared by the words counts of the word clouds ,
+the search index and the sentiment model instead of each one splitting the text again
+
+the words of tweet i are ids[offsets[i]:offsets[i + 1]] ( in the order they are in the tweet ) and
+vocabulary[id] is the word , the vocabulary is sorted so the words starting with a prefix are a range of it ,
+words are kept as written ( for the word clouds ) and lower_of maps each one to its lower case word in lower_vocabulary
+( for the search and the sentiment model )
+
+an id is 4 bytes and every distinct word is kept once , a list of python strings per tweet takes about 8 bytes
+per word for the pointer plus the string objects themselves
+
+the store of the cached dataset is saved next to its arrow file ( see dataset.py file ) , the arrays are memory mapped
+so all the app processes share the same pages of memory and only the vocabularies are read in each process
+'''
+import os
+import sys
+import weakref
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+'''
+distinct values of an arrow array sorted and the id of each value in that order
+'''
+def sorted_ids(values):
+    encoded = pc.dictionary_encode(values)
+    vocabulary = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+    order = np.argsort(vocabulary, kind='stable')
+    ranks = np.empty(len(order), dtype='int32')
+    ranks[order] = np.arange(len(order), dtype='int32')
+    return vocabulary[order], ranks[encoded.indices.to_numpy(zero_copy_only=False)]
+
+
+'''
+arrays saved as .npy files ( memory mapped when loaded ) and vocabularies saved as arrow files
+'''
+saved_arrays = ['offsets', 'ids', 'lower_of', 'rows', 'lower_ids']
+saved_vocabularies = ['vocabulary', 'lower_vocabulary']
+
+
+def saved_file(path, name, extension):
+    return '{}.{}.{}'.format(path, name, extension)
+
+
+class TokenStore:
+    def __init__(self, texts):
+        texts = pa.array(texts, type=pa.large_string())
+        if isinstance(texts, pa.ChunkedArray):
+            texts = texts.combine_chunks()
+
+        words = pc.utf8_split_whitespace(texts.fill_null(''))
+        flat_words = pc.list_flatten(words)
+        rows = pc.list_parent_indices(words).to_numpy(zero_copy_only=False)
+
+        # splitting keeps empty words before , between and after spaces that str.split() drops
+        not_empty = pc.greater(pc.binary_length(flat_words), 0)
+        flat_words = pc.filter(flat_words, not_empty)
+        rows = rows[not_empty.to_numpy(zero_copy_only=False)]
+
+        self.offsets = np.zeros(len(texts) + 1, dtype='int64')
+        np.cumsum(np.bincount(rows, minlength=len(texts)), out=self.offsets[1:])
+        self.vocabulary, self.ids = sorted_ids(flat_words)
+        self.lower_vocabulary, self.lower_of = sorted_ids(pc.utf8_lower(pa.array(self.vocabulary, type=pa.large_string())))
+
+        self._rows = None
+        self._lower_ids = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    '''
+    saving the store in files named after path ( each file is written to a temporary file first )
+    '''
+    def save(self, path):
+        arrays = dict(offsets=self.offsets, ids=self.ids, lower_of=self.lower_of, rows=self.rows(),
+                      lower_ids=self.lower_ids())
+        for name in saved_arrays:
+            temp_file = '{}.{}.tmp.npy'.format(saved_file(path, name, 'npy'), os.getpid())
+            np.save(temp_file, arrays[name])
+            os.replace(temp_file, saved_file(path, name, 'npy'))
+
+        for name in saved_vocabularies:
+            table = pa.table({'word': pa.array(getattr(self, name), type=pa.large_string())})
+            temp_file = '{}.{}.tmp'.format(saved_file(path, name, 'arrow'), os.getpid())
+            with pa.OSFile(temp_file, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(temp_file, saved_file(path, name, 'arrow'))
+
+    '''
+    the store saved in files named after path ( None when they don't all exist )
+    '''
+    @classmethod
+    def load(cls, path):
+        files = [saved_file(path, name, 'npy') for name in saved_arrays]
+        files += [saved_file(path, name, 'arrow') for name in saved_vocabularies]
+        if not all(os.path.exists(file) for file in files):
+            return None
+
+        store = cls.__new__(cls)
+        arrays = {name: np.load(saved_file(path, name, 'npy'), mmap_mode='r') for name in saved_arrays}
+        store.offsets, store.ids, store.lower_of = arrays['offsets'], arrays['ids'], arrays['lower_of']
+        store._rows, store._lower_ids = arrays['rows'], arrays['lower_ids']
+        for name in saved_vocabularies:
+            with pa.memory_map(saved_file(path, name, 'arrow')) as source:
+                words = pa.ipc.open_file(source).read_all().column('word')
+                setattr(store, name, np.asarray(words.to_pylist(), dtype=object))
+        return store
+
+    '''
+    memory used by the store ( arrays and vocabularies strings )
+    '''
+    def nbytes(self):
+        arrays = self.offsets.nbytes + self.ids.nbytes + self.lower_of.nbytes
+        arrays += self.vocabulary.nbytes + self.lower_vocabulary.nbytes
+        return arrays + sum(sys.getsizeof(word) for word in self.vocabulary) + sum(
+            sys.getsizeof(word) for word in self.lower_vocabulary)
+
+    '''
+    position of the tweet of each word
+    '''
+    def rows(self):
+        if self._rows is None:
+            self._rows = np.repeat(np.arange(len(self), dtype='int32'), np.diff(self.offsets))
+        return self._rows
+
+    '''
+    lower case word id of each word
+    '''
+    def lower_ids(self):
+        if self._lower_ids is None:
+            self._lower_ids = self.lower_of[self.ids]
+        return self._lower_ids
+
+    '''
+    number of times each word is used by each group of tweets , groups is a group number ( >= 0 ) for each tweet ,
+    returns the ( group , word id , count ) of every word used by a group
+    '''
+    def group_counts(self, groups):
+        groups = np.asarray(groups, dtype='int64')[self.rows()]
+        keys, counts = np.unique(groups * len(self.vocabulary) + self.ids, return_counts=True)
+        return keys // len(self.vocabulary), keys % len(self.vocabulary), counts
+
+    '''
+    the n most used words ( as written ) with their counts , of all tweets or the tweets of a boolean mask
+    '''
+    def top_terms(self, n=10, mask=None):
+        ids = self.ids if mask is None else self.ids[np.asarray(mask)[self.rows()]]
+        counts = np.bincount(ids, minlength=len(self.vocabulary))
+        top = np.argsort(-counts, kind='stable')[:n]
+        top = top[counts[top] > 0]
+        return list(zip(self.vocabulary[top], counts[top]))
+
+    '''
+    positions of the tweets using each lower case word : the tweets of lower_vocabulary[i] are
+    postings[offsets[i]:offsets[i + 1]] sorted , a word used twice in a tweet is kept once
+    '''
+    def postings(self):
+        rows_number = max(len(self), 1)
+        pairs = np.unique(self.lower_ids().astype('int64') * rows_number + self.rows())
+        postings = (pairs % rows_number).astype('int32')
+        offsets = np.zeros(len(self.lower_vocabulary) + 1, dtype='int64')
+        np.cumsum(np.bincount(pairs // rows_number, minlength=len(self.lower_vocabulary)), out=offsets[1:])
+        return offsets, postings
+
+    '''
+    the n lower case words used in the most tweets that also use word , with the number of those tweets
+    '''
+    def cooccurrence(self, word, n=10):
+        word_id = np.searchsorted(self.lower_vocabulary, word.lower())
+        if word_id == len(self.lower_vocabulary) or self.lower_vocabulary[word_id] != word.lower():
+            return []
+
+        lower_ids = self.lower_ids()
+        tweets = np.zeros(len(self), dtype=bool)
+        tweets[self.rows()[lower_ids == word_id]] = True
+
+        # each other word is counted once per tweet
+        selected = tweets[self.rows()] & (lower_ids != word_id)
+        pairs = np.unique(lower_ids[selected].astype('int64') * max(len(self), 1) + self.rows()[selected])
+        counts = np.bincount(pairs // max(len(self), 1), minlength=len(self.lower_vocabulary))
+        top = np.argsort(-counts, kind='stable')[:n]
+        top = top[counts[top] > 0]
+        return list(zip(self.lower_vocabulary[top], counts[top]))
+
+
+stores = {}
+
+
+def add_store(df, store):
+    key = id(df)
+    stores[key] = store
+    weakref.finalize(df, stores.pop, key, None)
+
+
+'''
+the token store of the text column of a dataframe , made once per dataframe and shared by everything using it
+'''
+def of(df):
+    if id(df) not in stores:
+        add_store(df, TokenStore(df['text']))
+    return stores[id(df)]
+
+
+'''
+using the store saved in files named after path for a dataframe ( of the same text ) , returns False when there is
+no saved store
+'''
+def use_saved(df, path):
+    store = TokenStore.load(path)
+    if store is None or len(store) != len(df):
+        return False
+    add_store(df, store)
+    return True
@@ -0,0 +1,133 @@
+'''
+trending words of each topic : the words used much more in the last days than in the days before
+
+the words counts by (topic, day, term) are counted once in aggregates.py file ( and added to when new tweets arrive ) ,
+for each topic they are kept as a sparse matrix of days x words ( the counts of day i are counts[offsets[i]:offsets[i + 1]]
+with their word codes ) so the counts of any window of days are one slice and one bincount , the text is never read again
+
+the score of a word compares its count in the last WINDOW_DAYS days with its count in the WINDOW_DAYS days before
+( scaled to the number of words of both windows ) : (recent - expected) / sqrt(expected + 1)
+'''
+import os
+import numpy as np
+import pandas as pd
+
+'''
+number of days of the recent window and of the window it is compared with ( set with DASHBOARD_TRENDING_DAYS )
+'''
+WINDOW_DAYS = int(os.environ.get('DASHBOARD_TRENDING_DAYS', 7))
+
+'''
+number of words shown and the minimum count of a word in the recent window ( rare words aren't trending )
+'''
+TOP_TERMS = 10
+MIN_COUNT = 5
+
+trending_columns = ['term', 'recent', 'previous', 'score']
+
+
+'''
+days x words matrix of words counts : the sorted days , the offsets of their counts and the word codes and counts
+'''
+def make_matrix(days, term_codes, counts):
+    order = np.argsort(days, kind='stable')
+    days, term_codes, counts = days[order], term_codes[order], counts[order]
+    matrix_days, day_sizes = np.unique(days, return_counts=True)
+    offsets = np.zeros(len(matrix_days) + 1, dtype='int64')
+    np.cumsum(day_sizes, out=offsets[1:])
+    return matrix_days, offsets, term_codes, counts
+
+
+class TermIndex:
+    def __init__(self, day_terms):
+        self.matrices = {}  # topic -> (days, offsets, term codes, counts)
+        self.vocabulary = np.array([], dtype=object)
+        self.codes = {}  # term -> code
+        if day_terms is not None and len(day_terms):
+            self.add(day_terms)
+
+    '''
+    adding words counts by (topic, day, term) , the new words get the next codes and the counts of days after the
+    last day of a topic are appended to its matrix ( a day can be in the matrix twice , its counts are still one slice )
+    '''
+    def add(self, day_terms):
+        term_codes, terms = pd.factorize(day_terms.index.get_level_values('term'))
+        codes = np.array([self.codes.get(term, -1) for term in terms], dtype='int64')
+        new = codes < 0
+        codes[new] = len(self.vocabulary) + np.arange(new.sum())
+        self.codes.update(zip(terms[new], codes[new]))
+        self.vocabulary = np.concatenate([self.vocabulary, np.asarray(terms[new], dtype=object)])
+
+        term_codes = codes[term_codes]
+        topics = day_terms.index.get_level_values('topic')
+        days = day_terms.index.get_level_values('created').to_numpy()
+        counts = day_terms.to_numpy(dtype='int64')
+
+        for topic in list(topics.unique()) + ['All Topics']:
+            selected = np.ones(len(counts), dtype=bool) if topic == 'All Topics' else (topics == topic)
+            self.add_matrix(topic, days[selected], term_codes[selected], counts[selected])
+
+    def add_matrix(self, topic, days, term_codes, counts):
+        if topic in self.matrices:
+            matrix_days, offsets, matrix_codes, matrix_counts = self.matrices[topic]
+            if days.min() < matrix_days[-1]:
+                # counts of days before the last one , the matrix is made again with them
+                days = np.concatenate([np.repeat(matrix_days, np.diff(offsets)), days])
+                term_codes = np.concatenate([matrix_codes, term_codes])
+                counts = np.concatenate([matrix_counts, counts])
+            else:
+                new_days, new_offsets, term_codes, counts = make_matrix(days, term_codes, counts)
+                self.matrices[topic] = (np.concatenate([matrix_days, new_days]),
+                                        np.concatenate([offsets, offsets[-1] + new_offsets[1:]]),
+                                        np.concatenate([matrix_codes, term_codes]),
+                                        np.concatenate([matrix_counts, counts]))
+                return
+        self.matrices[topic] = make_matrix(days, term_codes, counts)
+
+    '''
+    last day with words of a topic ( None when the topic has no words )
+    '''
+    def last_day(self, selected_topic):
+        if selected_topic not in self.matrices:
+            return None
+        return pd.Timestamp(self.matrices[selected_topic][0][-1])
+
+    '''
+    count of every word of the vocabulary in the days of a topic from start ( included ) to end ( excluded )
+    '''
+    def window_counts(self, selected_topic, start, end):
+        if selected_topic not in self.matrices:
+            return np.zeros(len(self.vocabulary), dtype='int64')
+        days, offsets, term_codes, counts = self.matrices[selected_topic]
+
+        first = np.searchsorted(days, np.datetime64(pd.Timestamp(start)), side='left')
+        last = np.searchsorted(days, np.datetime64(pd.Timestamp(end)), side='left')
+        cells = slice(offsets[first], offsets[last])
+        return np.bincount(term_codes[cells], weights=counts[cells], minlength=len(self.vocabulary)).astype('int64')
+
+
+'''
+the n words of a topic growing the most in the window_days days up to end ( the last day with tweets when None )
+compared with the window_days days before , as a dataframe of term , recent , previous and score sorted by score
+'''
+def trending_terms(aggregates, selected_topic, end=None, window_days=WINDOW_DAYS, n=TOP_TERMS):
+    index = aggregates.terms_index()
+    if end is None:
+        end = index.last_day(selected_topic)
+        if end is None:
+            return pd.DataFrame(columns=trending_columns)
+    end = pd.Timestamp(end).floor('D') + pd.Timedelta(days=1)
+    start = end - pd.Timedelta(days=window_days)
+
+    recent = index.window_counts(selected_topic, start, end)
+    previous = index.window_counts(selected_topic, start - pd.Timedelta(days=window_days), start)
+
+    # the previous counts scaled so a word used as often as before has a score of 0 even if the number of words changed
+    scale = (recent.sum() + 1) / (previous.sum() + 1)
+    expected = previous * scale
+    scores = (recent - expected) / np.sqrt(expected + 1)
+
+    candidates = np.flatnonzero((recent >= MIN_COUNT) & (scores > 0))
+    top = candidates[np.argsort(-scores[candidates], kind='stable')[:n]]
+    return pd.DataFrame({'term': index.vocabulary[top], 'recent': recent[top], 'previous': previous[top],
+                         'score': scores[top].round(2)}, columns=trending_columns)
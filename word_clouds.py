@@ -0,0 +1,126 @@
+'''
+making word cloud images of topics that don't have a ready image in the project folder
+
+the images are made from the word counts of each topic ( counted once in aggregates.py ) in a pool of background
+processes and saved in the cache folder under the dataset version so they are only made once for each dataset
+'''
+import concurrent.futures
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote
+import dataset
+
+WORD_CLOUDS_DIR = os.path.join(dataset.CACHE_DIR, 'wordclouds')
+
+'''
+number of processes making the images ( can be changed with the DASHBOARD_WORD_CLOUD_WORKERS environment variable )
+'''
+WORKERS = int(os.environ.get('DASHBOARD_WORD_CLOUD_WORKERS', 2))
+
+'''
+only the most used words are shown in the image
+'''
+MAX_WORDS = 100
+
+'''
+images of other dataset versions are kept while they are one of the KEEP_VERSIONS newest folders or were used
+in the last KEEP_SECONDS seconds ( another worker or a restart can still be using them )
+'''
+KEEP_VERSIONS = 3
+KEEP_SECONDS = 24 * 60 * 60
+
+
+def render_word_cloud(frequencies, path):
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(max_font_size=60, max_words=MAX_WORDS, background_color="#f7f7f7",
+                          random_state=42, relative_scaling=0.3,
+                          colormap='turbo',
+                          repeat=False)
+    # a topic without words ( all its words are stop words or it has no tweets yet ) gets an empty image
+    if frequencies:
+        image = wordcloud.generate_from_frequencies(frequencies).to_image()
+    else:
+        from PIL import Image
+        image = Image.new('RGB', (wordcloud.width, wordcloud.height), wordcloud.background_color)
+
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    image.save(temp_path, format='png')
+    os.replace(temp_path, path)
+    return path
+
+
+class WordCloudRenderer:
+    def __init__(self, folder, workers):
+        self.folder = folder
+        self.workers = workers
+        self.version = None  # version of the dataset the images are made from
+        self.executor = None
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    '''
+    making the next images from a new version of the dataset ( at start and when new tweets are read )
+    '''
+    def set_version(self, version):
+        # marking the folder of this version as used
+        folder = os.path.join(self.folder, version)
+        os.makedirs(folder, exist_ok=True)
+        os.utime(folder)
+
+        with self.lock:
+            self.version = version
+            # the jobs of the other versions aren't asked for anymore
+            self.futures = {path: future for path, future in self.futures.items()
+                            if os.path.dirname(path) == folder}
+
+        # removing the images of old versions of the dataset only
+        used = {}
+        for name in os.listdir(self.folder):
+            try:
+                used[name] = os.stat(os.path.join(self.folder, name)).st_mtime
+            except OSError:
+                pass
+        newest = sorted(used, key=used.get, reverse=True)[:KEEP_VERSIONS]
+        for name, used_time in used.items():
+            if name != version and name not in newest and time.time() - used_time > KEEP_SECONDS:
+                shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+
+    def path(self, topic):
+        return os.path.join(self.folder, self.version, '{}.png'.format(quote(topic, safe=' ')))
+
+    '''
+    starting to make the image of a topic in the background ( or getting the job already started for it , a job
+    that failed is started again ) , term_counts is the number of times each word is used in the topic
+    '''
+    def submit(self, topic, term_counts):
+        with self.lock:
+            path = self.path(topic)
+            future = self.futures.get(path)
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+
+            future = concurrent.futures.Future()
+            if os.path.exists(path):
+                future.set_result(path)
+            else:
+                if self.executor is None:
+                    self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # only the most used words are sent to the process
+                frequencies = term_counts[term_counts > 0].nlargest(MAX_WORDS).to_dict()
+                future = self.executor.submit(render_word_cloud, frequencies, path)
+
+            self.futures[path] = future
+            return future
+
+    '''
+    waiting for the image of a topic and returning its path
+    '''
+    def get(self, topic, term_counts):
+        return self.submit(topic, term_counts).result()
+
+
+renderer = WordCloudRenderer(WORD_CLOUDS_DIR, WORKERS)